@@ -0,0 +1,315 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+SRC_DIR = os.path.join(REPO_ROOT, "src")
+sys.path.insert(0, REPO_ROOT)
+
+from stub_llm_server import make_server  # noqa: E402
+from load_test import ask, wait_until_ready, percentile  # noqa: E402
+from synthetic_corpus import generate_corpus  # noqa: E402
+
+# --- Configuration ---
+OLLAMA_STUB_PORT = 18434
+OPENAI_STUB_PORT = 18001
+QA_PORT = 18000
+DEFAULT_TOLERANCE = 0.20  # Relative change tolerated before a metric counts as a regression.
+QUESTION_TEMPLATES = [
+    "What are the common approaches to modeling {term}?",
+    "Which authors have published papers on {term}?",
+    "Explain {term} in the context of financial trading.",
+    "List papers related to the topic of {term}.",
+]
+QUESTION_TERMS = [
+    "market volatility", "GARCH models", "reinforcement learning", "algorithmic trading",
+    "option pricing", "credit risk", "limit order books", "portfolio optimization",
+    "Monte Carlo simulation", "Kalman filters", "stochastic volatility", "asset pricing",
+]
+
+
+def make_questions(count):
+    return [
+        QUESTION_TEMPLATES[i % len(QUESTION_TEMPLATES)].format(term=QUESTION_TERMS[(i // len(QUESTION_TEMPLATES) + i) % len(QUESTION_TERMS)])
+        for i in range(count)
+    ]
+
+
+def run_stage(script, workdir, env):
+    """
+    Runs one pipeline script in `workdir` and returns its wall time, exit code and peak RSS.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(SRC_DIR, script)], cwd=workdir, env=env,
+                               stdout=subprocess.DEVNULL)
+    # wait4 reports the resource usage of this child alone (including its peak RSS in KiB).
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return {
+        "wall_seconds": time.perf_counter() - start,
+        "returncode": process.returncode,
+        "peak_rss_mb": usage.ru_maxrss / 1024,
+    }
+
+
+def load_run_metrics(workdir, run_name):
+    path = os.path.join(workdir, "metrics", f"{run_name}_latest.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def span_durations(run_metrics, name):
+    return [span["duration"] for span in run_metrics.get("spans", []) if span["name"] == name]
+
+
+def stage_seconds(run_metrics, name):
+    return run_metrics.get("stages", {}).get(name, {}).get("total_seconds", 0.0)
+
+
+def stage_counter(run_metrics, name, counter):
+    return run_metrics.get("stages", {}).get(name, {}).get("counters", {}).get(counter, 0)
+
+
+def process_peak_rss_mb(pid):
+    """Reads the peak resident set size of a live process from /proc (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def bench_qa(workdir, env, num_questions, concurrency):
+    """
+    Starts the QA server against the stubs and measures a cold pass over unique
+    questions followed by a repeated (cache-warm) pass. The persistent response cache
+    is cleared first, so a reused --workdir does not turn the cold pass into a warm one.
+    """
+    shutil.rmtree(os.path.join(workdir, ".cache"), ignore_errors=True)
+    server = subprocess.Popen([sys.executable, os.path.join(SRC_DIR, "qa_server.py"), "--port", str(QA_PORT)],
+                              cwd=workdir, env=env, stdout=subprocess.DEVNULL)
+    results = {}
+    try:
+        start = time.perf_counter()
+        if not wait_until_ready("127.0.0.1", QA_PORT, timeout=600):
+            print("[ERROR] QA server did not become ready.")
+            return results
+        results["startup_seconds"] = time.perf_counter() - start
+
+        questions = make_questions(num_questions)
+        first = ask("127.0.0.1", QA_PORT, questions[0])
+        results["time_to_first_answer_seconds"] = time.perf_counter() - start
+        results["first_query_ttft_seconds"] = first["ttft"]
+
+        for label, batch in (("cold", questions[1:]), ("warm", questions[1:])):
+            batch_start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                answers = list(executor.map(lambda q: ask("127.0.0.1", QA_PORT, q), batch))
+            elapsed = time.perf_counter() - batch_start
+            ok = [a for a in answers if a["status"] == 200]
+            results[label] = {
+                "queries_per_second": len(ok) / elapsed if elapsed else 0.0,
+                "errors": len(answers) - len(ok),
+                "ttft_p50": percentile([a["ttft"] for a in ok], 50),
+                "ttft_p95": percentile([a["ttft"] for a in ok], 95),
+                "latency_p50": percentile([a["total"] for a in ok], 50),
+                "latency_p95": percentile([a["total"] for a in ok], 95),
+                "latency_p99": percentile([a["total"] for a in ok], 99),
+            }
+        results["peak_rss_mb"] = process_peak_rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+
+def flatten(results):
+    """
+    Turns the raw results into {metric_name: {"value": x, "better": "lower"|"higher"}}.
+    """
+    metrics = {}
+
+    def add(name, value, better="lower"):
+        if value is not None:
+            metrics[name] = {"value": round(float(value), 6), "better": better}
+
+    for stage, data in results["stages"].items():
+        add(f"{stage}.wall_seconds", data["wall_seconds"])
+        add(f"{stage}.peak_rss_mb", data["peak_rss_mb"])
+        for name, value in data.get("throughput", {}).items():
+            add(f"{stage}.{name}", value, better="higher")
+        for name, value in data.get("latency", {}).items():
+            add(f"{stage}.{name}", value)
+
+    qa = results.get("qa", {})
+    for name in ("startup_seconds", "time_to_first_answer_seconds", "first_query_ttft_seconds", "peak_rss_mb"):
+        add(f"qa.{name}", qa.get(name))
+    for label in ("cold", "warm"):
+        for name, value in qa.get(label, {}).items():
+            if name == "errors":
+                continue
+            add(f"qa.{label}.{name}", value, better="higher" if name == "queries_per_second" else "lower")
+    return metrics
+
+
+def compare(metrics, baseline, tolerance):
+    """Prints a comparison table and returns the list of regressed metric names."""
+    regressions = []
+    print(f"\n{'metric':<45} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, current in sorted(metrics.items()):
+        base = baseline.get(name)
+        if base is None or not base["value"]:
+            print(f"{name:<45} {'-':>12} {current['value']:>12.4f}")
+            continue
+        change = (current["value"] - base["value"]) / abs(base["value"])
+        worse = change > tolerance if current["better"] == "lower" else change < -tolerance
+        flag = "  REGRESSION" if worse else ""
+        print(f"{name:<45} {base['value']:>12.4f} {current['value']:>12.4f} {change:>+8.1%}{flag}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline arKIv benchmark with a synthetic corpus and stub LLMs.")
+    parser.add_argument("--papers", type=int, default=200)
+    parser.add_argument("--pages", type=int, default=6)
+    parser.add_argument("--schema", choices=["oai", "arxiv", "mixed"], default="mixed")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="data_extractor worker processes")
+    parser.add_argument("--model", default=None, help="Sentence transformer model (default: the pipeline's)")
+    parser.add_argument("--ollama-latency", type=float, default=0.05, help="Stub Ollama response latency (s)")
+    parser.add_argument("--openai-latency", type=float, default=0.1, help="Stub OpenAI time to first token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="Stub OpenAI delay between tokens (s)")
+    parser.add_argument("--questions", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--skip-qa", action="store_true")
+    parser.add_argument("--workdir", default=None, help="Keep the corpus and outputs here instead of a temp dir")
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results", "latest.json"))
+    parser.add_argument("--baseline", default=None, help="Compare against this results file")
+    parser.add_argument("--save-baseline", default=None, help="Also write the results to this baseline file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="arkiv-bench-")
+    os.makedirs(workdir, exist_ok=True)
+
+    ollama = make_server(port=OLLAMA_STUB_PORT, first_token_delay=args.ollama_latency)
+    openai_stub = make_server(port=OPENAI_STUB_PORT, first_token_delay=args.openai_latency, token_delay=args.token_delay)
+    for stub in (ollama, openai_stub):
+        threading.Thread(target=stub.serve_forever, daemon=True).start()
+
+    env = dict(
+        os.environ,
+        PYTHONUNBUFFERED="1",
+        ARKIV_MAX_WORKERS=str(args.workers),
+        ARKIV_RETRY_DELAY="0",
+        LOCAL_LLM_ENDPOINT=f"http://127.0.0.1:{OLLAMA_STUB_PORT}/api/chat",
+        LLM_BASE_URL=f"http://127.0.0.1:{OPENAI_STUB_PORT}/v1",
+        LLM_API_KEY="stub-key",
+    )
+    if args.model:
+        env["ARKIV_MODEL_NAME"] = args.model
+
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "save_baseline")},
+        "stages": {},
+    }
+
+    try:
+        print(f"Generating {args.papers} synthetic papers in {workdir}...")
+        start = time.perf_counter()
+        generate_corpus(workdir, args.papers, args.pages, args.schema)
+        print(f"Corpus generated in {time.perf_counter() - start:.1f}s.")
+
+        print("Running data_extractor.py...")
+        stage = run_stage("data_extractor.py", workdir, env)
+        run_metrics = load_run_metrics(workdir, "data_extractor")
+        parse_s, encode_s = stage_seconds(run_metrics, "parse_pdfs"), stage_seconds(run_metrics, "encode")
+        stage["throughput"] = {
+            "pdfs_per_second": stage_counter(run_metrics, "parse_pdfs", "items") / parse_s if parse_s else 0.0,
+            "chunks_per_second": stage_counter(run_metrics, "encode", "items") / encode_s if encode_s else 0.0,
+        }
+        stage["stage_seconds"] = {name: s["total_seconds"] for name, s in run_metrics.get("stages", {}).items()}
+        results["stages"]["data_extractor"] = stage
+
+        print("Running citations.py...")
+        stage = run_stage("citations.py", workdir, env)
+        run_metrics = load_run_metrics(workdir, "citations")
+        refs_s = stage_seconds(run_metrics, "parse_references")
+        entries = stage_counter(run_metrics, "parse_references", "entries")
+        stage["throughput"] = {
+            "papers_per_second": stage_counter(run_metrics, "parse_references", "items") / refs_s if refs_s else 0.0,
+            "resolution_rate": stage_counter(run_metrics, "parse_references", "resolved") / entries if entries else 0.0,
+        }
+        stage["stage_seconds"] = {name: s["total_seconds"] for name, s in run_metrics.get("stages", {}).items()}
+        results["stages"]["citations"] = stage
+
+        print("Running kg_builder.py...")
+        stage = run_stage("kg_builder.py", workdir, env)
+        run_metrics = load_run_metrics(workdir, "kg_builder")
+        build_s = stage_seconds(run_metrics, "build_graph")
+        llm_calls = span_durations(run_metrics, "llm_call")
+        stage["throughput"] = {
+            "papers_per_second": stage_counter(run_metrics, "build_graph", "items") / build_s if build_s else 0.0,
+        }
+        stage["latency"] = {
+            "llm_call_p50": percentile(llm_calls, 50),
+            "llm_call_p95": percentile(llm_calls, 95),
+        }
+        stage["stage_seconds"] = {name: s["total_seconds"] for name, s in run_metrics.get("stages", {}).items()}
+        results["stages"]["kg_builder"] = stage
+
+        failed = [name for name, s in results["stages"].items() if s["returncode"] != 0]
+        if failed:
+            print(f"[ERROR] Stage(s) failed: {', '.join(failed)}")
+        elif not args.skip_qa:
+            print("Benchmarking the QA path...")
+            results["qa"] = bench_qa(workdir, env, args.questions, args.concurrency)
+    finally:
+        ollama.shutdown()
+        openai_stub.shutdown()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    results["metrics"] = flatten(results)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    if args.save_baseline:
+        shutil.copyfile(args.output, args.save_baseline)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("metrics", {})
+        regressions = compare(results["metrics"], baseline, args.tolerance)
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%} tolerance.")
+    else:
+        for name, metric in sorted(results["metrics"].items()):
+            print(f"  {name:<45} {metric['value']:.4f}")
+
+    if regressions or any(s["returncode"] != 0 for s in results["stages"].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
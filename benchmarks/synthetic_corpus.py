@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import random
+
+# --- Configuration ---
+DEFAULT_PAPERS = 200
+DEFAULT_PAGES = 6
+WORDS_PER_PAGE = 450
+DUPLICATE_RATE = 0.05  # share of papers that are cross-listed or re-versioned copies of an earlier one
+CATEGORIES = ["q-fin.RM", "q-fin.TR", "q-fin.PR", "q-fin.ST", "stat.ML", "cs.LG", "econ.EM"]
+FORENAMES = ["Alice", "Bruno", "Chen", "Dmitri", "Elena", "Farid", "Grace", "Hiroshi", "Ines", "Jonas",
+             "Kavya", "Luca", "Maria", "Nikolai", "Olga", "Pedro", "Qing", "Rahul", "Sofia", "Tomas"]
+SURNAMES = ["Smith", "Garcia", "Wang", "Ivanov", "Rossi", "Khan", "Müller", "Tanaka", "Silva", "Dubois",
+            "Kumar", "Novak", "Li", "Nguyen", "Cohen", "Schmidt", "Kim", "Lopez", "Ahmed", "Berg"]
+VOCABULARY = (
+    "volatility returns portfolio risk option pricing model market liquidity trading strategy "
+    "stochastic process estimation forecasting neural network regression factor asset equity "
+    "bond yield curve credit default hedging arbitrage momentum mean reversion covariance "
+    "garch lstm reinforcement learning monte carlo simulation bayesian inference kalman filter "
+    "limit order book microstructure high frequency execution transaction cost benchmark dataset "
+    "empirical evidence theorem proof estimator likelihood calibration sample out-of-sample "
+).split()
+# Boilerplate repeated across papers, as in real arXiv PDFs (licence text, headers).
+BOILERPLATE = (
+    "This work is licensed under a Creative Commons Attribution 4.0 International License. "
+    "Preprint submitted to the Journal of Quantitative Finance. All rights reserved."
+)
+
+
+def sentence(rng, words=18):
+    text = " ".join(rng.choice(VOCABULARY) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def paragraph(rng, sentences=6):
+    return " ".join(sentence(rng, rng.randint(10, 24)) for _ in range(sentences))
+
+
+def make_paper(rng, index):
+    """Builds the metadata of one synthetic paper (schema-neutral)."""
+    paper_id = f"{2001 + index // 99999:04d}.{index % 99999 + 1:05d}"
+    authors = [(rng.choice(FORENAMES), rng.choice(SURNAMES)) for _ in range(rng.randint(1, 4))]
+    year = 2015 + rng.randint(0, 9)
+    month = rng.randint(1, 12)
+    title = " ".join(w.capitalize() for w in rng.sample(VOCABULARY, rng.randint(5, 10)))
+    abstract = paragraph(rng, rng.randint(4, 7))
+    return {
+        "id": paper_id,
+        "title": title,
+        "authors": authors,
+        "categories": rng.sample(CATEGORIES, rng.randint(1, 3)),
+        "abstract": abstract,
+        "date": f"{year}-{month:02d}-{rng.randint(1, 28):02d}",
+        "doi": f"10.5555/synthetic.{index}" if rng.random() < 0.3 else None,
+        "text_seed": rng.getrandbits(32),  # seeds the body text, so copies can share it
+    }
+
+
+def make_copy(rng, paper, original):
+    """
+    Turns `paper` into a copy of `original` under its own id and date: an exact
+    cross-listing, or a re-version with one word of the abstract changed.
+    """
+    copy = dict(paper, title=original["title"], authors=original["authors"],
+                abstract=original["abstract"], text_seed=original["text_seed"])
+    if rng.random() < 0.5:
+        words = copy["abstract"].split()
+        words[rng.randrange(len(words))] = rng.choice(VOCABULARY)
+        copy["abstract"] = " ".join(words)
+    return copy
+
+
+def write_pdf(fitz, path, paper, pages, cited):
+    """
+    Writes the paper as a PDF, ending with a references section that cites
+    other corpus papers, alternately by arXiv id and by title only.
+    """
+    rng = random.Random(paper["text_seed"])
+    doc = fitz.open()
+    body = [paper["title"], BOILERPLATE, "Abstract", paper["abstract"]]
+    words_needed = pages * WORDS_PER_PAGE
+    while sum(len(b.split()) for b in body) < words_needed:
+        body.append(paragraph(rng))
+    references = ["References"]
+    for i, ref in enumerate(cited, start=1):
+        names = ", ".join(f"{forename[0]}. {surname}" for forename, surname in ref["authors"])
+        if i % 2:
+            references.append(f"[{i}] {names}. {ref['title']}. arXiv:{ref['id']}, {ref['date'][:4]}.")
+        else:
+            references.append(f"[{i}] {names}. {ref['title']}. Working paper, {ref['date'][:4]}.")
+
+    text = "\n\n".join(body)
+    words = text.split()
+    per_page = max(1, len(words) // pages)
+    for p in range(pages):
+        page = doc.new_page()
+        chunk = " ".join(words[p * per_page:(p + 1) * per_page] if p < pages - 1 else words[p * per_page:])
+        if p == pages - 1:
+            chunk += "\n\n" + "\n".join(references)
+        page.insert_textbox(fitz.Rect(50, 50, 545, 800), chunk, fontsize=6)
+    doc.save(path)
+    doc.close()
+
+
+def versioned_id(paper):
+    """The id as arxiv.Result.get_short_id() returns it ("2107.05580v1"), used by main.py."""
+    return f"{paper['id']}v1"
+
+
+def oai_schema(paper):
+    """Metadata as written by oai_down.py."""
+    return {
+        "id": paper["id"],
+        "title": paper["title"],
+        "authors": [f"{forename} {surname}" for forename, surname in paper["authors"]],
+        "categories": [" ".join(paper["categories"])],
+        "abstract": paper["abstract"],
+        "date": paper["date"],
+        "update_date": paper["date"],
+        "doi": [paper["doi"]] if paper["doi"] else [],
+    }
+
+
+def arxiv_api_schema(paper):
+    """Metadata as written by main.py (arXiv API scraper), which keeps the version in the id."""
+    return {
+        "paper_id": versioned_id(paper),
+        "title": paper["title"],
+        "authors": [f"{forename} {surname}" for forename, surname in paper["authors"]],
+        "abstract": paper["abstract"],
+        "published_date": f"{paper['date']}T00:00:00+00:00",
+        "categories": paper["categories"],
+    }
+
+
+def generate_corpus(output_dir, num_papers=DEFAULT_PAPERS, pages=DEFAULT_PAGES, schema="mixed", seed=0):
+    """
+    Generates `num_papers` PDFs in <output_dir>/papers and metadata JSON in <output_dir>/metadata.
+    About DUPLICATE_RATE of them are copies of earlier papers, so deduplication has work to do.
+    `schema` is "oai", "arxiv" or "mixed" (alternating); like main.py, the "arxiv" schema names
+    files and ids with the version suffix. Returns the list of paper ids as written.
+    """
+    import fitz  # PyMuPDF
+
+    rng = random.Random(seed)
+    paper_dir = os.path.join(output_dir, "papers")
+    metadata_dir = os.path.join(output_dir, "metadata")
+    os.makedirs(paper_dir, exist_ok=True)
+    os.makedirs(metadata_dir, exist_ok=True)
+
+    papers = []
+    copy_of = {}
+    for i in range(num_papers):
+        paper = make_paper(rng, i)
+        if i and rng.random() < DUPLICATE_RATE:
+            copy_of[i] = rng.randrange(i)
+            paper = make_copy(rng, paper, papers[copy_of[i]])
+        papers.append(paper)
+
+    cited_by = []
+    ids = []
+    for i, paper in enumerate(papers):
+        if i in copy_of:
+            cited = cited_by[copy_of[i]]
+        else:
+            cited = rng.sample(papers[:i], min(i, rng.randint(0, 8))) if i else []
+        cited_by.append(cited)
+
+        use_oai = schema == "oai" or (schema == "mixed" and i % 2 == 0)
+        file_id = paper["id"] if use_oai else versioned_id(paper)
+        ids.append(file_id)
+        write_pdf(fitz, os.path.join(paper_dir, f"{file_id}.pdf"), paper, pages, cited)
+
+        metadata = oai_schema(paper) if use_oai else arxiv_api_schema(paper)
+        with open(os.path.join(metadata_dir, f"{file_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=2)
+
+    return ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic arXiv-like corpus for benchmarks.")
+    parser.add_argument("output_dir")
+    parser.add_argument("--papers", type=int, default=DEFAULT_PAPERS)
+    parser.add_argument("--pages", type=int, default=DEFAULT_PAGES)
+    parser.add_argument("--schema", choices=["oai", "arxiv", "mixed"], default="mixed")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    ids = generate_corpus(args.output_dir, args.papers, args.pages, args.schema, args.seed)
+    print(f"Generated {len(ids)} papers in {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from stub_llm_server import make_server
+
+# --- Configuration ---
+QA_HOST = "127.0.0.1"
+QA_PORT = 8000
+STUB_PORT = 8001
+READY_TIMEOUT = 600  # seconds; the first start may need to download the model
+EXPECTED_ROUTES = {"vector_search", "graph_search"}  # QUESTIONS exercise both retrieval paths
+QUESTIONS = [
+    "What are the common approaches to modeling market volatility?",
+    "Which authors have published papers on GARCH models?",
+    "Explain reinforcement learning in the context of financial trading.",
+    "List papers related to the topic of Algorithmic Trading.",
+]
+
+
+def wait_until_ready(host, port, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=5)
+            conn.request("GET", "/health")
+            response = conn.getresponse()
+            status = json.loads(response.read() or b"{}").get("status")
+            conn.close()
+            if status == "ready":
+                return True
+            if status == "error":
+                return False
+        except (ConnectionError, OSError):
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def ask(host, port, question):
+    """
+    Sends one question and measures time-to-first-token and total latency.
+    """
+    start = time.perf_counter()
+    conn = http.client.HTTPConnection(host, port, timeout=300)
+    conn.request("POST", "/ask", body=json.dumps({"question": question}),
+                 headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    first_token = None
+    size = 0
+    while True:
+        data = response.read1(65536)
+        if not data:
+            break
+        if first_token is None:
+            first_token = time.perf_counter() - start
+        size += len(data)
+    total = time.perf_counter() - start
+    conn.close()
+    return {
+        "status": response.status,
+        "route": response.getheader("X-Route"),
+        "ttft": first_token if first_token is not None else total,
+        "total": total,
+        "bytes": size,
+    }
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(name, values):
+    print(f"  {name:<6} p50={percentile(values, 50) * 1000:8.1f}ms  "
+          f"p95={percentile(values, 95) * 1000:8.1f}ms  "
+          f"p99={percentile(values, 99) * 1000:8.1f}ms  "
+          f"mean={statistics.mean(values) * 1000:8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the QA server against a stub LLM.")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--first-token-delay", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--no-spawn", action="store_true",
+                        help="Use an already running QA server instead of starting one.")
+    parser.add_argument("--cache", action="store_true",
+                        help="Keep the QA caches on. By default the spawned server runs with ARKIV_CACHE=0, "
+                             "since the questions repeat and cached answers would be replayed in one chunk.")
+    args = parser.parse_args()
+    passed = False
+
+    stub = make_server(port=STUB_PORT, first_token_delay=args.first_token_delay, token_delay=args.token_delay)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    print(f"Stub LLM server running on port {STUB_PORT}.")
+
+    server_process = None
+    if not args.no_spawn:
+        env = dict(os.environ,
+                   LLM_BASE_URL=f"http://127.0.0.1:{STUB_PORT}/v1",
+                   LLM_API_KEY="stub-key",
+                   ARKIV_CACHE="1" if args.cache else "0",
+                   PYTHONUNBUFFERED="1")
+        server_process = subprocess.Popen(
+            [sys.executable, os.path.join("src", "qa_server.py"), "--port", str(QA_PORT)],
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+
+    try:
+        print("Waiting for QA server to become ready...")
+        if not wait_until_ready(QA_HOST, QA_PORT, READY_TIMEOUT):
+            print("[ERROR] QA server did not become ready.")
+            return False
+
+        questions = [QUESTIONS[i % len(QUESTIONS)] for i in range(args.requests)]
+        print(f"Sending {args.requests} requests with concurrency {args.concurrency}...")
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            results = list(executor.map(lambda q: ask(QA_HOST, QA_PORT, q), questions))
+        elapsed = time.perf_counter() - start
+
+        ok = [r for r in results if r["status"] == 200]
+        print(f"\n--- Results ({len(ok)}/{len(results)} succeeded in {elapsed:.1f}s, "
+              f"{len(results) / elapsed:.1f} req/s) ---")
+        if ok:
+            report("TTFT", [r["ttft"] for r in ok])
+            report("Total", [r["total"] for r in ok])
+            routes = {}
+            for r in ok:
+                routes[r["route"]] = routes.get(r["route"], 0) + 1
+            print(f"  Routes: {routes}")
+        # Fewer requests than QUESTIONS may legitimately miss a route.
+        missing = EXPECTED_ROUTES - {r["route"] for r in ok} if args.requests >= len(QUESTIONS) else set()
+        if missing:
+            print(f"[ERROR] No requests took the {', '.join(sorted(missing))} route(s).")
+        passed = len(ok) == len(results) and not missing
+    finally:
+        if server_process:
+            server_process.terminate()
+            server_process.wait()
+        stub.shutdown()
+    return passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -42,21 +42,12 @@ fi
 
 # --- Execution Pipeline ---
 
+# src/pipeline.py runs oai_down.py, then data_extractor.py and kg_builder.py in parallel,
+# then qa_system.py. Stages whose inputs are unchanged since their last run are skipped.
+# Extra arguments are passed through, e.g. ./run.sh --offline or ./run.sh --force embeddings
 echo
-echo "[Step 1/4] Running main.py to scrape papers and metadata..."
-python3 src/oai_down.py
-
-echo
-echo "[Step 2/4] Running data_extractor.py to create embeddings..."
-python3 src/data_extractor.py
-
-echo
-echo "[Step 3/4] Running kg_builder.py to build the knowledge graph (using local Ollama)..."
-python3 src/kg_builder.py
-
-echo
-echo "[Step 4/4] Running qa_system.py to start the question-answering interface (using API key)..."
-python3 src/qa_system.py
+echo "Running the pipeline (embeddings and knowledge graph run in parallel)..."
+python3 src/pipeline.py "$@"
 
 echo
 echo "==================================="
@@ -0,0 +1,364 @@
+import re
+import sqlite3
+import threading
+from itertools import combinations
+
+# --- Configuration ---
+AGGREGATES_PATH = "kg_aggregates.sqlite"
+ENTITY_TYPES = ("methodology", "topic", "category")
+MAX_COAUTHORS = 50     # papers with more authors (collaborations) are left out of co-authorship pairs
+MAX_NAME_WORDS = 8     # longest entity name matched in a question
+GROWTH_WINDOW_MONTHS = 12
+DEFAULT_LIMIT = 10
+SCHEMA_VERSION = 1     # bumped when the meaning of the stored aggregates changes
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (paper_id TEXT PRIMARY KEY, month TEXT NOT NULL, categories TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS paper_entities (
+    paper_id TEXT NOT NULL, type TEXT NOT NULL, entity TEXT NOT NULL,
+    PRIMARY KEY (paper_id, type, entity));
+CREATE TABLE IF NOT EXISTS entity_monthly (
+    type TEXT NOT NULL, entity TEXT NOT NULL, month TEXT NOT NULL, papers INTEGER NOT NULL,
+    PRIMARY KEY (type, entity, month));
+CREATE TABLE IF NOT EXISTS author_entity_monthly (
+    author TEXT NOT NULL, type TEXT NOT NULL, entity TEXT NOT NULL, month TEXT NOT NULL, papers INTEGER NOT NULL,
+    PRIMARY KEY (type, entity, author, month));
+CREATE TABLE IF NOT EXISTS coauthorship (
+    author_a TEXT NOT NULL, author_b TEXT NOT NULL, papers INTEGER NOT NULL,
+    PRIMARY KEY (author_a, author_b));
+CREATE INDEX IF NOT EXISTS coauthorship_b ON coauthorship (author_b);
+CREATE INDEX IF NOT EXISTS entity_monthly_month ON entity_monthly (type, month);
+CREATE TABLE IF NOT EXISTS aliases (
+    type TEXT NOT NULL, alias TEXT NOT NULL, canonical TEXT NOT NULL,
+    PRIMARY KEY (type, alias));
+CREATE INDEX IF NOT EXISTS aliases_canonical ON aliases (type, canonical);
+"""
+
+
+def month_of(date):
+    """"2021-03-15" or "2021-03-15T00:00:00+00:00" -> "2021-03"; "" when unknown."""
+    match = re.match(r"(\d{4})-(\d{2})", date or "")
+    return f"{match.group(1)}-{match.group(2)}" if match else ""
+
+
+def shift_month(month, months):
+    year, mon = map(int, month.split("-"))
+    index = year * 12 + (mon - 1) + months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def name_tokens(text):
+    return re.findall(r"\w+", text.lower())
+
+
+class GraphAggregates:
+    """
+    Materialized knowledge-graph aggregates in SQLite, updated paper by paper:
+    paper counts per methodology/topic/category/author per month, per-author counts per
+    entity and month, and weighted co-authorship edges. Each paper's contribution is
+    recorded, so re-adding a paper replaces it instead of counting it twice.
+    paper_entities keeps the names as extracted; the aggregates count canonical entities, each
+    at most once per paper, so a paper listing both "LSTM" and "LSTMs" counts once.
+    """
+
+    def __init__(self, path=AGGREGATES_PATH, readonly=False):
+        self.path = path
+        self._lock = threading.Lock()
+        self._names = None
+        self._aliases = None
+        if readonly:
+            self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.executescript(SCHEMA)
+            # Files written before aggregates held canonical names are recomputed once.
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                self._rebuild()
+                self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                self._conn.commit()
+
+    # --- Updates ---
+
+    def add_paper(self, paper_id, date, categories, entities):
+        """
+        Adds (or replaces) one paper. `entities` maps "author", "methodology" and "topic"
+        to the names attached to the paper. Returns False if it was already counted as is.
+        """
+        month = month_of(date)
+        entities = {t: sorted(set(names)) for t, names in entities.items() if names}
+        entities["category"] = sorted(set(categories))
+        entities = {t: names for t, names in entities.items() if names}
+        with self._lock:
+            row = self._conn.execute("SELECT month FROM papers WHERE paper_id = ?", (paper_id,)).fetchone()
+            if row is not None:
+                previous = self._paper_entities(paper_id)
+                if row[0] == month and previous == entities:
+                    return False
+                self._apply(row[0], previous, -1)
+                self._conn.execute("DELETE FROM paper_entities WHERE paper_id = ?", (paper_id,))
+            self._apply(month, entities, 1)
+            self._conn.execute("INSERT OR REPLACE INTO papers (paper_id, month, categories) VALUES (?, ?, ?)",
+                               (paper_id, month, " ".join(entities.get("category", []))))
+            self._conn.executemany("INSERT INTO paper_entities (paper_id, type, entity) VALUES (?, ?, ?)",
+                                   [(paper_id, t, name) for t, names in entities.items() for name in names])
+            self._names = None
+            return True
+
+    def remove_paper(self, paper_id):
+        with self._lock:
+            row = self._conn.execute("SELECT month FROM papers WHERE paper_id = ?", (paper_id,)).fetchone()
+            if row is None:
+                return False
+            self._apply(row[0], self._paper_entities(paper_id), -1)
+            self._conn.execute("DELETE FROM paper_entities WHERE paper_id = ?", (paper_id,))
+            self._conn.execute("DELETE FROM papers WHERE paper_id = ?", (paper_id,))
+            self._names = None
+            return True
+
+    def prune(self, keep_ids):
+        """Removes papers that are no longer in the corpus. Returns how many were removed."""
+        keep_ids = set(keep_ids)
+        stale = [pid for (pid,) in self._conn.execute("SELECT paper_id FROM papers") if pid not in keep_ids]
+        for paper_id in stale:
+            self.remove_paper(paper_id)
+        return len(stale)
+
+    def set_aliases(self, alias_table):
+        """
+        Replaces the alias table with the output of entity resolution ({type: {alias: canonical}}).
+        If it changed, the aggregates are recomputed from paper_entities under the new aliases.
+        Returns True if they were.
+        """
+        aliases = {(t, alias): canonical for t, table in alias_table.items() for alias, canonical in table.items()}
+        with self._lock:
+            if aliases == self._alias_map():
+                return False
+            self._conn.execute("DELETE FROM aliases")
+            self._conn.executemany("INSERT INTO aliases (type, alias, canonical) VALUES (?, ?, ?)",
+                                   [(t, alias, canonical) for (t, alias), canonical in aliases.items()])
+            self._aliases = aliases
+            self._rebuild()
+            return True
+
+    def _rebuild(self):
+        """Recomputes every aggregate from paper_entities."""
+        for table in ("entity_monthly", "author_entity_monthly", "coauthorship"):
+            self._conn.execute(f"DELETE FROM {table}")
+        for paper_id, month in self._conn.execute("SELECT paper_id, month FROM papers").fetchall():
+            self._apply(month, self._paper_entities(paper_id), 1)
+        self._names = None
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+
+    def _paper_entities(self, paper_id):
+        entities = {}
+        for entity_type, entity in self._conn.execute(
+                "SELECT type, entity FROM paper_entities WHERE paper_id = ? ORDER BY type, entity", (paper_id,)):
+            entities.setdefault(entity_type, []).append(entity)
+        return entities
+
+    def _alias_map(self):
+        if self._aliases is None:
+            self._aliases = {(t, alias): canonical for t, alias, canonical
+                             in self._conn.execute("SELECT type, alias, canonical FROM aliases")}
+        return self._aliases
+
+    def _apply(self, month, entities, sign):
+        """
+        Adds (sign=1) or subtracts (sign=-1) one paper's contribution to every aggregate,
+        with its names mapped to canonical entities and counted once each.
+        """
+        aliases = self._alias_map()
+        entities = {t: sorted({aliases.get((t, name), name) for name in names}) for t, names in entities.items()}
+        self._conn.executemany(
+            "INSERT INTO entity_monthly (type, entity, month, papers) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (type, entity, month) DO UPDATE SET papers = papers + excluded.papers",
+            [(t, name, month, sign) for t, names in entities.items() for name in names])
+        authors = entities.get("author", [])
+        self._conn.executemany(
+            "INSERT INTO author_entity_monthly (author, type, entity, month, papers) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (type, entity, author, month) DO UPDATE SET papers = papers + excluded.papers",
+            [(author, t, name, month, sign) for author in authors
+             for t in ENTITY_TYPES for name in entities.get(t, [])])
+        if len(authors) <= MAX_COAUTHORS:
+            self._conn.executemany(
+                "INSERT INTO coauthorship (author_a, author_b, papers) VALUES (?, ?, ?) "
+                "ON CONFLICT (author_a, author_b) DO UPDATE SET papers = papers + excluded.papers",
+                [(a, b, sign) for a, b in combinations(authors, 2)])
+        if sign < 0:
+            for table in ("entity_monthly", "author_entity_monthly", "coauthorship"):
+                self._conn.execute(f"DELETE FROM {table} WHERE papers <= 0")
+
+    # --- Queries ---
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def canonical(self, entity_type, name):
+        with self._lock:
+            return self._alias_map().get((entity_type, name), name)
+
+    def match_entities(self, text, types=ENTITY_TYPES + ("author",)):
+        """
+        Finds entity names (or aliases) mentioned in `text` by looking up its word n-grams.
+        Returns [(type, canonical name)], longest matches first, without overlaps.
+        """
+        with self._lock:
+            if self._names is None:
+                self._names = self._load_names()
+            names = self._names
+        tokens = name_tokens(text)
+        found, used = [], set()
+        for size in range(min(MAX_NAME_WORDS, len(tokens)), 0, -1):
+            for start in range(len(tokens) - size + 1):
+                span = range(start, start + size)
+                if used.intersection(span):
+                    continue
+                for entity_type, name in names.get(" ".join(tokens[start:start + size]), ()):
+                    if entity_type in types and (entity_type, name) not in found:
+                        found.append((entity_type, name))
+                        used.update(span)
+        return found
+
+    def _load_names(self):
+        names = {}
+        # Extracted names, so aliases mentioned in a question resolve to their canonical entity.
+        rows = self._conn.execute(
+            "SELECT DISTINCT e.type, e.entity, COALESCE(a.canonical, e.entity) FROM paper_entities e "
+            "LEFT JOIN aliases a ON a.type = e.type AND a.alias = e.entity").fetchall()
+        for entity_type, entity, canonical in rows:
+            key = " ".join(name_tokens(entity))
+            # Bare surnames ("Long", "Price") would match ordinary words in questions.
+            if not key or (entity_type == "author" and len(key.split()) < 2):
+                continue
+            entries = names.setdefault(key, [])
+            if (entity_type, canonical) not in entries:
+                entries.append((entity_type, canonical))
+        return names
+
+    def top_authors(self, entity_type=None, entity=None, since="", until="9999-99", limit=DEFAULT_LIMIT):
+        """Most productive authors, overall or on one entity, within a month range."""
+        if entity is None:
+            return self._query(
+                "SELECT entity AS author, SUM(papers) AS n FROM entity_monthly "
+                "WHERE type = 'author' AND month >= ? AND month <= ? "
+                "GROUP BY author ORDER BY n DESC, author LIMIT ?", (since, until, limit))
+        return self._query(
+            "SELECT author, SUM(papers) AS n FROM author_entity_monthly "
+            "WHERE type = ? AND entity = ? AND month >= ? AND month <= ? "
+            "GROUP BY author ORDER BY n DESC, author LIMIT ?",
+            (entity_type, self.canonical(entity_type, entity), since, until, limit))
+
+    def trend(self, entity_type, entity, since="", until="9999-99"):
+        """Papers per year for one entity (aliases included)."""
+        return self._query(
+            "SELECT substr(month, 1, 4) AS year, SUM(papers) FROM entity_monthly "
+            "WHERE type = ? AND entity = ? AND month != '' AND month >= ? AND month <= ? "
+            "GROUP BY year ORDER BY year", (entity_type, self.canonical(entity_type, entity), since, until))
+
+    def growing(self, entity_type="topic", window=GROWTH_WINDOW_MONTHS, limit=DEFAULT_LIMIT):
+        """
+        Entities whose paper count grew most in the last `window` months (up to the latest
+        month in the data) compared with the `window` months before.
+        Returns (window start month, [(name, recent, previous)]).
+        """
+        latest = self._query("SELECT MAX(month) FROM papers WHERE month != ''")[0][0]
+        if not latest:
+            return None, []
+        recent_start = shift_month(latest, -(window - 1))
+        previous_start = shift_month(latest, -(2 * window - 1))
+        rows = self._query(
+            "SELECT entity AS name, "
+            "SUM(CASE WHEN month >= ? THEN papers ELSE 0 END) AS recent, "
+            "SUM(CASE WHEN month < ? THEN papers ELSE 0 END) AS previous "
+            "FROM entity_monthly WHERE type = ? AND month >= ? GROUP BY name "
+            "ORDER BY recent - previous DESC, recent DESC LIMIT ?",
+            (recent_start, recent_start, entity_type, previous_start, limit))
+        return recent_start, rows
+
+    def coauthors(self, author, limit=DEFAULT_LIMIT):
+        """Most frequent co-authors of an author, weighted by shared papers."""
+        author = self.canonical("author", author)
+        return self._query(
+            "SELECT other AS name, SUM(papers) AS n FROM ("
+            "SELECT author_b AS other, papers FROM coauthorship WHERE author_a = ? UNION ALL "
+            "SELECT author_a AS other, papers FROM coauthorship WHERE author_b = ?) "
+            "GROUP BY name ORDER BY n DESC, name LIMIT ?", (author, author, limit))
+
+    def author_productivity(self, author):
+        """Papers per year for one author (name variants included)."""
+        return self.trend("author", author)
+
+
+# --- Question answering ---
+
+def _year_range(question):
+    since, until = "", "9999-99"
+    match = re.search(r"\b(?:since|after|from)\s+((?:19|20)\d{2})\b", question)
+    if match:
+        since = f"{match.group(1)}-01"
+    match = re.search(r"\b(?:in|during)\s+((?:19|20)\d{2})\b", question)
+    if match and not since:
+        since, until = f"{match.group(1)}-01", f"{match.group(1)}-12"
+    match = re.search(r"\b(?:until|before|up to)\s+((?:19|20)\d{2})\b", question)
+    if match:
+        until = f"{int(match.group(1)) - (1 if 'before' in match.group(0) else 0)}-12"
+    return since, until
+
+
+def _range_label(since, until):
+    if since and until != "9999-99":
+        return f" between {since} and {until}"
+    if since:
+        return f" since {since}"
+    return f" up to {until}" if until != "9999-99" else ""
+
+
+def aggregate_context(aggregates, question):
+    """
+    Answers counting, ranking and trend questions ("top authors on GARCH since 2020",
+    "which topics are growing", "who collaborates with Jane Doe") from the materialized
+    aggregates without walking the graph or calling the LLM. Returns None for other questions.
+    """
+    q = question.lower()
+    since, until = _year_range(q)
+    entities = aggregates.match_entities(question)
+    authors = [name for t, name in entities if t == "author"]
+    topics = [(t, name) for t, name in entities if t != "author"]
+    lines = []
+
+    if authors and re.search(r"co-?auth|collaborat|work(?:s|ed)? with", q):
+        for author in authors:
+            rows = aggregates.coauthors(author)
+            lines.append(f"Most frequent co-authors of {author} (shared papers): "
+                         + (", ".join(f"{name} ({n})" for name, n in rows) or "none found"))
+    elif re.search(r"\b(?:grow\w*|trending|rising|emerging|increasing|declining|hot)\b", q) and not topics:
+        entity_type = "methodology" if re.search(r"method", q) else "category" if re.search(r"categor", q) else "topic"
+        start, rows = aggregates.growing(entity_type)
+        if start:
+            lines.append(f"{entity_type.capitalize()} paper counts in the {GROWTH_WINDOW_MONTHS} months from {start} "
+                         f"vs. the {GROWTH_WINDOW_MONTHS} months before (change):")
+            lines.extend(f"  - {name}: {recent} vs. {previous} ({recent - previous:+d})" for name, recent, previous in rows)
+    elif re.search(r"\b(?:top|most|prolific|productive|leading|main)\b.*\bauthors?\b|\bauthors?\b.*\b(?:most|top)\b"
+                   r"|\bwho (?:has )?(?:published|written|wrote) the most\b", q):
+        if topics:
+            for entity_type, name in topics:
+                rows = aggregates.top_authors(entity_type, name, since, until)
+                lines.append(f"Top authors on {name} ({entity_type}){_range_label(since, until)} (papers): "
+                             + (", ".join(f"{author} ({n})" for author, n in rows) or "none found"))
+        else:
+            rows = aggregates.top_authors(since=since, until=until)
+            lines.append(f"Most productive authors{_range_label(since, until)} (papers): "
+                         + ", ".join(f"{author} ({n})" for author, n in rows))
+    elif re.search(r"\b(?:trend|over time|per year|by year|each year|how many|number of|popular\w*|productiv\w*)\b", q) \
+            and (topics or authors):
+        for entity_type, name in topics + [("author", a) for a in authors]:
+            rows = aggregates.trend(entity_type, name, since, until)
+            lines.append(f"Papers per year on {name} ({entity_type}){_range_label(since, until)}: "
+                         + (", ".join(f"{year}: {n}" for year, n in rows) or "none found")
+                         + f" (total {sum(n for _, n in rows)})")
+
+    return "\n".join(lines) if lines else None
@@ -0,0 +1,240 @@
+import os
+import re
+import json
+import hashlib
+import unicodedata
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz  # PyMuPDF
+from tqdm import tqdm
+
+from tracing import get_tracer
+
+tracer = get_tracer("citations")
+
+# --- Configuration ---
+PAPER_DIR = "papers"
+METADATA_DIR = "metadata"
+REFERENCES_DIR = "references"   # cached bibliography text, one file per paper
+CITATIONS_PATH = "citations.json"
+MAX_WORKERS = int(os.environ.get("ARKIV_MAX_WORKERS", 40))
+MAX_REFERENCE_PAGES = 12        # pages read from the end of a PDF while looking for the bibliography
+MIN_TITLE_WORDS = 4             # shorter titles ("Introduction", "A note") are too ambiguous to match
+CHUNKSIZE = 64                  # papers per task sent to a worker
+
+HEADING_RE = re.compile(r'^\s*(?:\d+\.?\s*)?(?:references|bibliography|literature cited)\s*$', re.IGNORECASE | re.MULTILINE)
+ARXIV_NEW_RE = re.compile(r'(?<![\d.])(\d{4}\.\d{4,5})(?:v\d+)?(?![\d])')
+ARXIV_OLD_RE = re.compile(r'\b([a-z\-]+(?:\.[A-Z]{2})?/\d{7})(?:v\d+)?\b')
+DOI_RE = re.compile(r'\b(10\.\d{4,9}/[^\s"<>]+)', re.IGNORECASE)
+ENTRY_MARKER_RE = re.compile(r'(?:^|\n)\s*\[\d{1,3}\]\s*')
+NUMBERED_ENTRY_RE = re.compile(r'\n\s*\d{1,3}\.\s+(?=[A-Z])')
+
+# Set in each worker by init_worker, so the index is sent once per process rather than per paper.
+_index = None
+
+
+def normalize_paper_id(paper_id):
+    """Drops the version suffix ("2107.05580v1" -> "2107.05580"); main.py stores versioned ids."""
+    return re.sub(r'v\d+$', '', paper_id)
+
+
+def normalize_title(text):
+    """Lowercase ASCII words only, so PDF text and metadata titles compare equal."""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text).split())
+
+
+def title_hash(normalized):
+    return int.from_bytes(hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def build_index(metadata_dir=METADATA_DIR):
+    """
+    Builds the lookup tables from the metadata files: arXiv id -> paper id, DOI -> paper id
+    and 64-bit normalized-title hash -> paper id (titles shared by several papers are dropped).
+    Also returns the PDF file stem -> paper id map (old-style ids are saved without the archive).
+    """
+    arxiv_ids, dois, titles, stems = {}, {}, {}, {}
+    ambiguous = set()
+    for filename in os.listdir(metadata_dir):
+        if not filename.endswith('.json'):
+            continue
+        with open(os.path.join(metadata_dir, filename), 'r', encoding='utf-8') as f:
+            paper = json.load(f)
+        # oai_down.py writes "id"; the arXiv API scraper (main.py) writes "paper_id".
+        paper_id = paper.get("id") or paper.get("paper_id")
+        if not paper_id:
+            continue
+        paper_id = normalize_paper_id(paper_id)
+        arxiv_ids[paper_id] = paper_id
+        stems[paper_id.split('/')[-1]] = paper_id
+        for doi in paper.get("doi") or []:
+            dois[doi.lower()] = paper_id
+        normalized = normalize_title(paper.get("title", ""))
+        if len(normalized.split()) >= MIN_TITLE_WORDS:
+            key = title_hash(normalized)
+            if key in titles and titles[key] != paper_id:
+                ambiguous.add(key)
+            titles[key] = paper_id
+    for key in ambiguous:
+        del titles[key]
+    return {"arxiv": arxiv_ids, "doi": dois, "title": titles}, stems
+
+
+def extract_references(filepath):
+    """
+    Returns the bibliography text of a PDF: everything after the last "References" heading,
+    reading pages backwards from the end. Empty if no heading is found.
+    """
+    with fitz.open(filepath) as doc:
+        text = ""
+        for page_number in range(len(doc) - 1, max(-1, len(doc) - 1 - MAX_REFERENCE_PAGES), -1):
+            text = (doc[page_number].get_text() or "") + text
+            headings = list(HEADING_RE.finditer(text))
+            if headings:
+                return text[headings[-1].end():]
+    return ""
+
+
+def cached_references(filepath, paper_stem):
+    """Reads the bibliography from the cache, extracting it from the PDF when missing or stale."""
+    cache_path = os.path.join(REFERENCES_DIR, f"{paper_stem}.txt")
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(filepath):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return f.read(), True
+    references = extract_references(filepath)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(references)
+    os.replace(tmp_path, cache_path)
+    return references, False
+
+
+def split_entries(references):
+    """Splits a bibliography into entries: "[n]" markers, "n." numbering, or one entry per sentence-final line."""
+    if len(ENTRY_MARKER_RE.findall(references)) >= 2:
+        entries = ENTRY_MARKER_RE.split(references)
+    elif len(NUMBERED_ENTRY_RE.findall(references)) >= 2:
+        entries = NUMBERED_ENTRY_RE.split("\n" + references)
+    else:
+        entries = re.split(r'(?<=\.)\s*\n', references)
+    entries = [" ".join(entry.replace('-\n', '').split()) for entry in entries]
+    return [entry for entry in entries if len(entry) > 10]
+
+
+def resolve_entry(entry, index):
+    """
+    Resolves one bibliography entry to a corpus paper id. Returns (paper_id, method) or (None, None).
+    Tries arXiv ids, then DOIs, then the title: every sentence-like segment of the entry and
+    each pair of adjacent segments is looked up in the normalized-title hash index.
+    """
+    for match in ARXIV_NEW_RE.finditer(entry):
+        if match.group(1) in index["arxiv"]:
+            return index["arxiv"][match.group(1)], "arxiv_id"
+    for match in ARXIV_OLD_RE.finditer(entry):
+        if match.group(1) in index["arxiv"]:
+            return index["arxiv"][match.group(1)], "arxiv_id"
+    for match in DOI_RE.finditer(entry):
+        doi = match.group(1).rstrip('.,;)]').lower()
+        if doi in index["doi"]:
+            return index["doi"][doi], "doi"
+
+    segments = [normalize_title(s) for s in re.split(r'[.?!]\s+|["“”]', entry)]
+    segments = [s for s in segments if s]
+    candidates = segments + [f"{a} {b}" for a, b in zip(segments, segments[1:])]
+    for candidate in candidates:
+        if len(candidate.split()) >= MIN_TITLE_WORDS:
+            paper_id = index["title"].get(title_hash(candidate))
+            if paper_id:
+                return paper_id, "title"
+    return None, None
+
+
+def init_worker(index):
+    global _index
+    _index = index
+
+
+def parse_paper(task):
+    """Worker: (pdf path, citing paper id) -> (citing id, number of entries, [(cited id, method)], cache hit)."""
+    filepath, paper_id = task
+    paper_stem = os.path.splitext(os.path.basename(filepath))[0]
+    try:
+        references, cache_hit = cached_references(filepath, paper_stem)
+    except Exception as e:
+        print(f" - Error reading references of {os.path.basename(filepath)}: {e}")
+        return paper_id, 0, [], False
+    entries = split_entries(references)
+    resolved = []
+    for entry in entries:
+        cited, method = resolve_entry(entry, _index)
+        if cited and cited != paper_id:
+            resolved.append((cited, method))
+    return paper_id, len(entries), resolved, cache_hit
+
+
+def main():
+    """
+    Parses the bibliographies of all PDFs in parallel, resolves them to corpus papers
+    without any LLM calls and writes the citation lists and resolution statistics.
+    """
+    if not os.path.exists(PAPER_DIR) or not os.path.exists(METADATA_DIR):
+        print(f"Error: '{PAPER_DIR}' and '{METADATA_DIR}' are both required.")
+        return
+    os.makedirs(REFERENCES_DIR, exist_ok=True)
+
+    with tracer.span("build_index") as span:
+        index, stems = build_index()
+        span.add("items", len(index["arxiv"]))
+    print(f"Indexed {len(index['arxiv'])} papers ({len(index['doi'])} DOIs, {len(index['title'])} titles).")
+
+    pdf_files = sorted(f for f in os.listdir(PAPER_DIR) if f.endswith('.pdf'))
+    # main.py names PDFs "<id>vN.pdf"; the citing id must be unversioned like the graph's paper nodes.
+    tasks = [(os.path.join(PAPER_DIR, f), stems.get(normalize_paper_id(f[:-4]), normalize_paper_id(f[:-4])))
+             for f in pdf_files]
+
+    citations = {}
+    methods = Counter()
+    entries_total = 0
+    with_references = 0
+    print(f"Parsing references of {len(tasks)} PDF files using up to {MAX_WORKERS} cores...")
+    with tracer.span("parse_references", workers=MAX_WORKERS) as span, \
+            ProcessPoolExecutor(max_workers=MAX_WORKERS, initializer=init_worker, initargs=(index,)) as executor:
+        results = executor.map(parse_paper, tasks, chunksize=CHUNKSIZE)
+        for paper_id, entries, resolved, cache_hit in tqdm(results, total=len(tasks), desc="Resolving citations"):
+            span.add("items")
+            span.add("cache_hits", int(cache_hit))
+            span.add("entries", entries)
+            span.add("resolved", len(resolved))
+            entries_total += entries
+            with_references += bool(entries)
+            methods.update(method for _, method in resolved)
+            cited = sorted({cited for cited, _ in resolved})
+            if cited:
+                citations[paper_id] = cited
+
+    resolved_total = sum(methods.values())
+    stats = {
+        "papers": len(tasks),
+        "papers_with_references": with_references,
+        "entries": entries_total,
+        "resolved": resolved_total,
+        "resolution_rate": round(resolved_total / entries_total, 4) if entries_total else 0.0,
+        "resolved_by": dict(methods),
+        "citation_edges": sum(len(cited) for cited in citations.values()),
+    }
+    with open(CITATIONS_PATH, 'w', encoding='utf-8') as f:
+        json.dump({"stats": stats, "citations": citations}, f, indent=2)
+
+    print(f"\nResolved {resolved_total} of {entries_total} reference entries to corpus papers "
+          f"({stats['resolution_rate']:.1%}; {dict(methods)}).")
+    print(f"{stats['citation_edges']} citation edges from {len(citations)} papers saved to {CITATIONS_PATH}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        tracer.print_summary()
+        tracer.write()
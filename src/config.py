@@ -2,6 +2,9 @@ import os
 
 def load_api_key():
     """Loads the API key from a file named 'api.key' in the root directory."""
+    # An explicit environment variable wins (used by the load test's stub server).
+    if os.environ.get("LLM_API_KEY"):
+        return os.environ["LLM_API_KEY"]
     try:
         with open("api.key", "r") as f:
             key = f.read().strip()
@@ -22,6 +25,18 @@ LLM_API_KEY = load_api_key()
 
 # Example for a known provider (e.g., OpenAI-compatible):
 LLM_API_ENDPOINT = "https://api.openai.com/v1/chat/completions"
+# Optional base URL for an OpenAI-compatible server (e.g. "http://localhost:8001/v1").
+# Leave unset to use the official OpenAI API.
+LLM_BASE_URL = os.environ.get("LLM_BASE_URL") or None
+
+# --- QA Server Configuration ---
+QA_SERVER_HOST = os.environ.get("QA_SERVER_HOST", "127.0.0.1")
+QA_SERVER_PORT = int(os.environ.get("QA_SERVER_PORT", "8000"))
+# Threads used for CPU-bound work (encoding, FAISS search).
+QA_SERVER_WORKERS = int(os.environ.get("QA_SERVER_WORKERS", "4"))
+# Threads that wait on the LLM (routing, entity extraction, streamed answers). They are idle
+# most of the time, so there can be many more of them than cores.
+QA_SERVER_IO_WORKERS = int(os.environ.get("QA_SERVER_IO_WORKERS", "64"))
 
 # --- Prompt Configuration ---
 # This prompt instructs the LLM to act as an expert in quantitative finance
@@ -5,19 +5,39 @@ import numpy as np
 import faiss
 import json
 import re
+import sys
+import hashlib
+import shutil
+import subprocess
 from tqdm import tqdm
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor
+
+from tracing import get_tracer
+import dedup
+
+tracer = get_tracer("data_extractor")
 
 
 # --- Configuration ---
 PAPER_DIR = "papers"
 VECTOR_STORE_PATH = "vector_store.index"
 METADATA_STORE_PATH = "metadata.json"
-MODEL_NAME = 'all-mpnet-base-v2'
+MODEL_NAME = os.environ.get("ARKIV_MODEL_NAME", 'all-mpnet-base-v2')
 # Set the number of parallel processes. Defaults to number of cores.
 # On Debian, you can find the number of cores with `nproc`.
 # Let's use a few less than max to keep the system responsive.
-MAX_WORKERS = 40    
+MAX_WORKERS = int(os.environ.get("ARKIV_MAX_WORKERS", 40))
+
+# --- Sharding Configuration ---
+SHARD_DIR = "shards"
+# Vector ids are (shard << SHARD_ID_BITS) + local chunk number, so ids from different
+# shards never collide and a shard can be rebuilt without renumbering the others.
+SHARD_ID_BITS = 40
+
+# --- Deduplication Configuration ---
+# Exact and near-duplicate chunks (SimHash) are not encoded; they point to a canonical vector.
+DEDUP_ENABLED = os.environ.get("ARKIV_DEDUP", "1") != "0"
+DEDUP_REPORT_PATH = "dedup_report.json"
 
 def clean_text(text):
     """
@@ -46,7 +66,8 @@ def chunk_text(text, chunk_size=512, overlap=64):
 def process_pdf(filepath):
     """
     Processes a single PDF file: extracts, cleans, and chunks text.
-    Returns a tuple of (paper_id, list_of_chunks).
+    Returns a tuple of (paper_id, list_of_chunks, list_of_fingerprints).
+    Fingerprints for deduplication are computed here so they run in the worker processes.
     """
     paper_id = os.path.splitext(os.path.basename(filepath))[0]
     try:
@@ -55,45 +76,67 @@ def process_pdf(filepath):
 
         cleaned_text = clean_text(full_text)
         if not cleaned_text:
-            return paper_id, []
+            return paper_id, [], []
 
         text_chunks = chunk_text(cleaned_text)
-        return paper_id, text_chunks
+        fingerprints = [dedup.fingerprint(chunk) for chunk in text_chunks] if DEDUP_ENABLED else []
+        return paper_id, text_chunks, fingerprints
     except Exception as e:
         print(f" - Error processing {os.path.basename(filepath)}: {e}")
-        return paper_id, []
+        return paper_id, [], []
 
-def main():
-    """
-    Main function to process PDFs, create embeddings, and build a vector store.
-    """
-    if not os.path.exists(PAPER_DIR):
-        print(f"Directory '{PAPER_DIR}' not found. Please run main.py to download papers first.")
-        return
+def shard_of(paper_id, num_shards):
+    """Deterministic hash partition of papers over shards (stable across machines and runs)."""
+    digest = hashlib.md5(paper_id.encode("utf-8")).hexdigest()
+    return int(digest, 16) % num_shards
 
-    pdf_files = [os.path.join(PAPER_DIR, f) for f in os.listdir(PAPER_DIR) if f.endswith('.pdf')]
-    if not pdf_files:
-        print(f"No PDF files found in '{PAPER_DIR}'.")
-        return
+def list_pdfs(shard=None, num_shards=1):
+    pdf_files = sorted(f for f in os.listdir(PAPER_DIR) if f.endswith('.pdf'))
+    if shard is not None:
+        pdf_files = [f for f in pdf_files if shard_of(os.path.splitext(f)[0], num_shards) == shard]
+    return [os.path.join(PAPER_DIR, f) for f in pdf_files]
 
+def extract_chunks(pdf_files, id_offset=0):
+    """
+    Parses the PDFs in parallel. Returns (chunks, metadata, dedup_report) where metadata
+    maps each vector id (starting at `id_offset`) to its paper id, chunk id and text.
+    Duplicate chunks get no vector id of their own: they are listed under "duplicates"
+    on their canonical chunk's metadata entry instead. Results are consumed in the order of
+    `pdf_files`, so the canonical copy of a duplicate is the same on every run.
+    """
     all_chunks = []
     metadata = {}
-    chunk_id_counter = 0
+    chunk_id_counter = id_offset
+    deduplicator = dedup.Deduplicator()
+    paper_chunks = {}
+    canonical_paper_of = {}  # paper id -> papers its duplicate chunks point to
 
     print(f"Processing {len(pdf_files)} PDF files using up to {MAX_WORKERS} cores...")
-    with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        # Submit all PDF processing tasks
-        future_to_pdf = {executor.submit(process_pdf, pdf_path): pdf_path for pdf_path in pdf_files}
-
-        # Process results as they complete
-        for future in tqdm(as_completed(future_to_pdf), total=len(pdf_files), desc="Processing PDFs"):
-            paper_id, text_chunks = future.result()
+    with tracer.span("parse_pdfs", workers=MAX_WORKERS) as span, ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        # Parse in parallel, but consume results in (sorted) file order: completion order
+        # would make the choice of canonical chunk, and the vector ids, vary between runs.
+        results = executor.map(process_pdf, pdf_files)
+        for pdf_path, (paper_id, text_chunks, fingerprints) in tqdm(zip(pdf_files, results), total=len(pdf_files), desc="Processing PDFs"):
+            span.add("items")
+            span.add("bytes", os.path.getsize(pdf_path))
             if not text_chunks:
+                span.add("empty")
                 print(f" - No text extracted from {paper_id}.pdf, skipping.")
                 continue
+            span.add("chunks", len(text_chunks))
+            paper_chunks[paper_id] = len(text_chunks)
 
             for i, chunk in enumerate(text_chunks):
                 chunk_id = f"{paper_id}_chunk_{i}"
+                if fingerprints:
+                    canonical = deduplicator.add(chunk_id_counter, *fingerprints[i])
+                    if canonical is not None:
+                        span.add("duplicates")
+                        metadata[canonical].setdefault("duplicates", []).append(
+                            {"paper_id": paper_id, "chunk_id": chunk_id}
+                        )
+                        canonical_paper_of.setdefault(paper_id, []).append(metadata[canonical]["paper_id"])
+                        continue
                 all_chunks.append(chunk)
                 metadata[chunk_id_counter] = {
                     "paper_id": paper_id,
@@ -102,31 +145,238 @@ def main():
                 }
                 chunk_id_counter += 1
 
-    if not all_chunks:
-        print("No text chunks were generated. Exiting.")
-        return
+    report = deduplicator.stats()
+    report["duplicate_papers"] = dedup.duplicate_papers(paper_chunks, canonical_paper_of)
+    if DEDUP_ENABLED:
+        print(f"Deduplication: {report['exact_duplicates']} exact and {report['near_duplicates']} near-duplicate "
+              f"chunks skipped out of {report['chunks']} (ratio {report['dedup_ratio']:.1%}); "
+              f"{len(report['duplicate_papers'])} duplicate papers.")
+    return all_chunks, metadata, report
 
+def write_dedup_report(report, path=DEDUP_REPORT_PATH):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=4)
+    print(f"Saved deduplication report to {path}")
+
+def encode_chunks(all_chunks):
     print("\nLoading sentence transformer model...")
-    model = SentenceTransformer(MODEL_NAME)
+    with tracer.span("load_model", model=MODEL_NAME):
+        model = SentenceTransformer(MODEL_NAME)
     print("Model loaded.")
 
     print(f"\nGenerating embeddings for {len(all_chunks)} text chunks...")
-    embeddings = model.encode(all_chunks, show_progress_bar=True, device='cuda' if 'cuda' in str(faiss.get_num_gpus()) else 'cpu')
-    embedding_dim = embeddings.shape[1]
+    with tracer.span("encode") as span:
+        embeddings = model.encode(all_chunks, show_progress_bar=True, device='cuda' if 'cuda' in str(faiss.get_num_gpus()) else 'cpu')
+        span.add("items", len(all_chunks))
+    return np.array(embeddings).astype('float32')
 
+def build_index(embeddings, ids):
     print("Building FAISS index...")
-    index = faiss.IndexFlatL2(embedding_dim)
-    index = faiss.IndexIDMap(index)
-    index.add_with_ids(np.array(embeddings).astype('float32'), np.arange(len(all_chunks)))
+    with tracer.span("build_index", dim=int(embeddings.shape[1])) as span:
+        index = faiss.IndexFlatL2(embeddings.shape[1])
+        index = faiss.IndexIDMap(index)
+        index.add_with_ids(embeddings, np.asarray(ids, dtype='int64'))
+        span.add("items", len(ids))
+    return index
+
+def write_outputs(index, metadata, index_path=VECTOR_STORE_PATH, metadata_path=METADATA_STORE_PATH):
+    print(f"Saving FAISS index to {index_path}")
+    with tracer.span("write_index") as span:
+        faiss.write_index(index, index_path)
+        span.add("bytes", os.path.getsize(index_path))
+
+    write_metadata(metadata, metadata_path)
+
+def write_metadata(metadata, metadata_path=METADATA_STORE_PATH):
+    print(f"Saving metadata to {metadata_path}")
+    with tracer.span("write_metadata") as span:
+        with open(metadata_path, 'w') as f:
+            json.dump(metadata, f, indent=4)
+        span.add("bytes", os.path.getsize(metadata_path))
+
+def main():
+    """
+    Main function to process PDFs, create embeddings, and build a vector store.
+    """
+    if not os.path.exists(PAPER_DIR):
+        print(f"Directory '{PAPER_DIR}' not found. Please run main.py to download papers first.")
+        return
 
-    print(f"Saving FAISS index to {VECTOR_STORE_PATH}")
-    faiss.write_index(index, VECTOR_STORE_PATH)
+    pdf_files = list_pdfs()
+    if not pdf_files:
+        print(f"No PDF files found in '{PAPER_DIR}'.")
+        return
+
+    all_chunks, metadata, dedup_report = extract_chunks(pdf_files)
+    if not all_chunks:
+        print("No text chunks were generated. Exiting.")
+        return
+    if DEDUP_ENABLED:
+        write_dedup_report(dedup_report)
 
-    print(f"Saving metadata to {METADATA_STORE_PATH}")
-    with open(METADATA_STORE_PATH, 'w') as f:
-        json.dump(metadata, f, indent=4)
+    embeddings = encode_chunks(all_chunks)
+    index = build_index(embeddings, list(metadata.keys()))
+    write_outputs(index, metadata)
 
     print("\nData extraction and embedding generation complete.")
 
+# --- Sharded mode ---
+
+def shard_path(shard_dir, shard):
+    return os.path.join(shard_dir, f"shard_{shard:03d}")
+
+def run_shard(shard, num_shards, shard_dir=SHARD_DIR):
+    """
+    Builds one shard: the PDFs whose hash partition is `shard`. Writes the embeddings,
+    their ids and the chunk store to shards/shard_NNN/; the merge builds the index from them.
+    Several machines can each run one shard against a shared (or synced) papers/ directory.
+    """
+    if not os.path.exists(PAPER_DIR):
+        print(f"Directory '{PAPER_DIR}' not found. Please run main.py to download papers first.")
+        return False
+
+    tracer.run_name = f"data_extractor_shard{shard:03d}"
+    out_dir = shard_path(shard_dir, shard)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)  # Mark the shard incomplete until this run finishes.
+
+    pdf_files = list_pdfs(shard, num_shards)
+    print(f"Shard {shard}/{num_shards}: {len(pdf_files)} PDF files.")
+    # Deduplication is per shard; copies of a paper that hash to other shards are not caught.
+    all_chunks, metadata, dedup_report = extract_chunks(pdf_files, id_offset=shard << SHARD_ID_BITS)
+    if DEDUP_ENABLED:
+        write_dedup_report(dedup_report, os.path.join(out_dir, "dedup_report.json"))
+
+    if all_chunks:
+        embeddings = encode_chunks(all_chunks)
+        ids = np.asarray(list(metadata.keys()), dtype='int64')
+        write_metadata(metadata, os.path.join(out_dir, "chunks.json"))
+        np.save(os.path.join(out_dir, "embeddings.npy"), embeddings)
+        np.save(os.path.join(out_dir, "ids.npy"), ids)
+        dim = int(embeddings.shape[1])
+    else:
+        print("No text chunks were generated for this shard.")
+        dim = None
+
+    # The manifest is written last; the merge step treats its presence as "shard complete".
+    with open(manifest_path, 'w') as f:
+        json.dump({
+            "shard": shard,
+            "num_shards": num_shards,
+            "model": MODEL_NAME,
+            "dim": dim,
+            "papers": len(pdf_files),
+            "chunks": len(all_chunks),
+        }, f, indent=4)
+    print(f"\nShard {shard} complete: {len(all_chunks)} chunks written to {out_dir}")
+    return True
+
+def merge_shards(shard_dir=SHARD_DIR, num_shards=None):
+    """
+    Combines every completed shard into the single vector store and metadata file used by
+    qa_system.py. Refuses to merge if shards are missing or were built with different models.
+    With `num_shards`, shards left over from a run with another shard count are ignored.
+    """
+    manifests = []
+    for name in sorted(os.listdir(shard_dir)) if os.path.isdir(shard_dir) else []:
+        manifest_path = os.path.join(shard_dir, name, "manifest.json")
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r') as f:
+                manifests.append(json.load(f))
+    if num_shards is not None:
+        stale = [m["shard"] for m in manifests if m["num_shards"] != num_shards]
+        if stale:
+            print(f"Ignoring shard(s) {stale} from a run with a different shard count.")
+        manifests = [m for m in manifests if m["num_shards"] == num_shards]
+    if not manifests:
+        print(f"No completed shards found in '{shard_dir}'.")
+        return False
+
+    num_shards = manifests[0]["num_shards"]
+    found = {m["shard"] for m in manifests}
+    missing = sorted(set(range(num_shards)) - found)
+    if missing or any(m["num_shards"] != num_shards for m in manifests):
+        print(f"Cannot merge: expected {num_shards} shards, missing {missing or 'none'} "
+              f"(or shards come from runs with different shard counts).")
+        return False
+    models = {m["model"] for m in manifests if m["chunks"]}
+    dims = {m["dim"] for m in manifests if m["chunks"]}
+    if len(models) > 1 or len(dims) > 1:
+        print(f"Cannot merge shards built with different models/dimensions: {models} {dims}")
+        return False
+    if not dims:
+        print("All shards are empty. Nothing to merge.")
+        return False
+
+    index = faiss.IndexIDMap(faiss.IndexFlatL2(dims.pop()))
+    metadata = {}
+    with tracer.span("merge_shards", shards=num_shards) as span:
+        for manifest in sorted(manifests, key=lambda m: m["shard"]):
+            if not manifest["chunks"]:
+                continue
+            out_dir = shard_path(shard_dir, manifest["shard"])
+            embeddings = np.load(os.path.join(out_dir, "embeddings.npy"))
+            ids = np.load(os.path.join(out_dir, "ids.npy"))
+            index.add_with_ids(embeddings, ids)
+            with open(os.path.join(out_dir, "chunks.json"), 'r') as f:
+                metadata.update(json.load(f))
+            span.add("items", len(ids))
+
+    write_outputs(index, metadata)
+    print(f"\nMerged {num_shards} shards: {index.ntotal} vectors.")
+    return True
+
+def run_local_shards(num_shards, shard_dir=SHARD_DIR):
+    """
+    Runs every shard as a separate local process (standing in for separate nodes),
+    splitting MAX_WORKERS between them, then merges the results. Shard directories left
+    over from an earlier run with more shards are removed first.
+    """
+    if os.path.isdir(shard_dir):
+        for name in os.listdir(shard_dir):
+            match = re.fullmatch(r'shard_(\d+)', name)
+            if match and int(match.group(1)) >= num_shards:
+                shutil.rmtree(os.path.join(shard_dir, name))
+    workers_per_shard = max(1, MAX_WORKERS // num_shards)
+    env = dict(os.environ, ARKIV_MAX_WORKERS=str(workers_per_shard))
+    processes = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "--shard", str(shard),
+                          "--num-shards", str(num_shards), "--shard-dir", shard_dir], env=env)
+        for shard in range(num_shards)
+    ]
+    failed = [shard for shard, process in enumerate(processes) if process.wait() != 0]
+    if failed:
+        print(f"Shard process(es) {failed} failed; not merging.")
+        return False
+    return merge_shards(shard_dir, num_shards)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Extract text from PDFs, embed it and build the FAISS vector store.")
+    parser.add_argument("command", nargs="?", choices=["build", "merge"], default="build",
+                        help="'build' (default) embeds papers; 'merge' combines completed shards")
+    parser.add_argument("--shard", type=int, help="Build only this shard (0-based); requires --num-shards")
+    parser.add_argument("--num-shards", type=int, default=1)
+    parser.add_argument("--local-shards", type=int, help="Build N shards as local processes, then merge")
+    parser.add_argument("--shard-dir", default=SHARD_DIR)
+    args = parser.parse_args()
+
+    ok = True
+    try:
+        if args.command == "merge":
+            ok = merge_shards(args.shard_dir)
+        elif args.local_shards:
+            ok = run_local_shards(args.local_shards, args.shard_dir)
+        elif args.shard is not None:
+            if not 0 <= args.shard < args.num_shards:
+                parser.error("--shard must be between 0 and --num-shards - 1")
+            ok = run_shard(args.shard, args.num_shards, args.shard_dir)
+        else:
+            main()
+    finally:
+        tracer.print_summary()
+        tracer.write()
+    sys.exit(0 if ok else 1)
\ No newline at end of file
@@ -0,0 +1,121 @@
+import hashlib
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+
+# --- Configuration ---
+SHINGLE_SIZE = 3        # words per shingle
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4       # 4 bands of 16 bits: any pair within distance 3 shares a band (pigeonhole)
+MAX_HAMMING_DISTANCE = 3
+# A paper counts as a duplicate of another when at least this share of its chunks
+# are duplicates, most of them of that one paper (e.g. a second arXiv version).
+DUPLICATE_PAPER_THRESHOLD = 0.8
+
+
+def normalize_chunk(text):
+    """Lowercases and strips punctuation/whitespace differences before hashing."""
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def simhash(tokens):
+    """
+    64-bit SimHash over word shingles. Near-identical texts get hashes that differ in few bits.
+    """
+    if len(tokens) >= SHINGLE_SIZE:
+        shingles = [" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)]
+    else:
+        shingles = [" ".join(tokens)]
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles),
+        dtype=np.uint64, count=len(shingles),
+    )
+    bits = np.unpackbits(hashes.view(np.uint8)).reshape(-1, SIMHASH_BITS)
+    # Each bit of the fingerprint is the majority vote of that bit over all shingles.
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+    return int.from_bytes(np.packbits(votes > 0).tobytes(), "big")
+
+
+def fingerprint(text):
+    """
+    Returns (exact_key, simhash) for a chunk. Cheap enough to run in the PDF worker processes.
+    """
+    normalized = normalize_chunk(text)
+    exact_key = hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+    return exact_key, simhash(normalized.split())
+
+
+class Deduplicator:
+    """
+    Streams chunk fingerprints and maps each duplicate to the first chunk seen with the
+    same content (exact) or a SimHash within MAX_HAMMING_DISTANCE bits (near-duplicate).
+    Candidate pairs come from banded LSH buckets, so there is no all-pairs comparison.
+    """
+
+    def __init__(self, max_distance=MAX_HAMMING_DISTANCE):
+        self.max_distance = max_distance
+        self.band_bits = SIMHASH_BITS // SIMHASH_BANDS
+        self.exact = {}
+        self.buckets = [defaultdict(list) for _ in range(SIMHASH_BANDS)]
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+        self.total = 0
+
+    def _bands(self, value):
+        mask = (1 << self.band_bits) - 1
+        return [(value >> (band * self.band_bits)) & mask for band in range(SIMHASH_BANDS)]
+
+    def add(self, key, exact_key, simhash_value):
+        """
+        Registers a chunk under `key`. Returns the key of its canonical chunk if it is a
+        duplicate, otherwise None (and the chunk becomes canonical for later ones).
+        """
+        self.total += 1
+        canonical = self.exact.get(exact_key)
+        if canonical is not None:
+            self.exact_duplicates += 1
+            return canonical
+
+        bands = self._bands(simhash_value)
+        if self.max_distance > 0:
+            for band, bucket in zip(bands, self.buckets):
+                for candidate_key, candidate_hash in bucket.get(band, ()):
+                    if (candidate_hash ^ simhash_value).bit_count() <= self.max_distance:
+                        self.near_duplicates += 1
+                        self.exact[exact_key] = candidate_key
+                        return candidate_key
+
+        self.exact[exact_key] = key
+        for band, bucket in zip(bands, self.buckets):
+            bucket[band].append((key, simhash_value))
+        return None
+
+    def stats(self):
+        duplicates = self.exact_duplicates + self.near_duplicates
+        return {
+            "chunks": self.total,
+            "unique": self.total - duplicates,
+            "exact_duplicates": self.exact_duplicates,
+            "near_duplicates": self.near_duplicates,
+            "dedup_ratio": round(duplicates / self.total, 4) if self.total else 0.0,
+        }
+
+
+def duplicate_papers(paper_chunks, canonical_paper_of, threshold=DUPLICATE_PAPER_THRESHOLD):
+    """
+    Finds papers that are (near-)copies of another paper.
+    `paper_chunks` maps paper id -> number of chunks; `canonical_paper_of` maps
+    paper id -> list of paper ids that its duplicate chunks point to.
+    Returns {duplicate paper id: canonical paper id}.
+    """
+    duplicates = {}
+    for paper_id, targets in canonical_paper_of.items():
+        total = paper_chunks.get(paper_id, 0)
+        if not total or len(targets) / total < threshold:
+            continue
+        target, count = Counter(targets).most_common(1)[0]
+        if target != paper_id and count / total >= threshold:
+            duplicates[paper_id] = target
+    return duplicates
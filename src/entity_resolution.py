@@ -0,0 +1,245 @@
+import re
+import unicodedata
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+# --- Configuration ---
+SHINGLE_SIZE = 3            # characters per shingle
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 16              # 16 bands of 8 rows: ~95% of pairs at 0.8 Jaccard become candidates, ~6% at 0.5
+SIMILARITY_THRESHOLD = 0.8  # Jaccard similarity of shingle sets needed to merge two names
+MAX_WORD_EDITS = 2          # ... and each differing word must be within this many edits (1 below LONG_WORD)
+LONG_WORD = 8
+MIN_FUZZY_LENGTH = 5        # Shorter names (mostly acronyms) are only merged on exact keys
+MAX_ACRONYM_LENGTH = 6      # Words this short with two or more capitals ("VaR", "LSTMs") keep their case
+NAME_SUFFIXES = {"jr", "sr", "ii", "iii", "iv"}
+MINHASH_BATCH = 256         # names hashed per numpy batch (keeps the working set in cache)
+
+_rng = np.random.default_rng(0)
+# Multiply-add hashing modulo 2**64 (numpy wraps around); odd multipliers keep it a permutation.
+_PERM_A = _rng.integers(0, 1 << 63, size=NUM_PERMUTATIONS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_PERM_B = _rng.integers(0, 1 << 63, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        parent = self.parent.setdefault(item, item)
+        if parent != item:
+            parent = self.parent[item] = self.find(parent)
+        return parent
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+
+def strip_accents(text):
+    if text.isascii():
+        return text
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def singular(word):
+    """Crude plural stripping, enough for "LSTMs" / "models" / "processes"."""
+    if len(word) > 4 and word.endswith("es") and word[-3] in "sxz":
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "is", "us")):
+        return word[:-1]
+    return word
+
+
+def is_acronym(word):
+    return len(word) <= MAX_ACRONYM_LENGTH and sum(c.isupper() for c in word) >= 2
+
+
+def normalize_name(name):
+    """
+    Key under which spelling variants of a methodology or topic coincide:
+    "Monte-Carlo Simulations" and "monte carlo simulation" both become "monte carlo simulation".
+    Acronyms keep their case, since "VaR" (Value at Risk) and "VAR" (vector autoregression) differ.
+    """
+    text = strip_accents(name)
+    text = re.sub(r"\([^)]*\)", " ", text)  # "Long Short-Term Memory (LSTM)" -> acronym handled separately
+    text = re.sub(r"[-_/]", " ", text)
+    text = re.sub(r"[^\w\s]", "", text)
+    return " ".join(singular(word if is_acronym(word) else word.lower()) for word in text.split())
+
+
+def parenthetical(name):
+    """The normalized "(LSTM)" part of "Long Short-Term Memory (LSTM)", if any."""
+    match = re.search(r"\(([^)]+)\)", name)
+    return normalize_name(match.group(1)) if match else None
+
+
+def edit_distance(a, b):
+    """Levenshtein distance between two words."""
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def similar_keys(a, b, shingles_a, shingles_b):
+    """
+    Whether two keys are spelling variants: similar shingle sets, the same number of words, and
+    every differing pair of words a small typo apart with the same first letter. Extra words
+    ("deep reinforcement learning") or letters added in front ("GARCH" / "EGARCH") make a different name.
+    """
+    words_a, words_b = a.split(), b.split()
+    if len(words_a) != len(words_b):
+        return False
+    for word_a, word_b in zip(words_a, words_b):
+        if word_a == word_b:
+            continue
+        max_edits = MAX_WORD_EDITS if min(len(word_a), len(word_b)) >= LONG_WORD else 1
+        if word_a[0] != word_b[0] or edit_distance(word_a, word_b) > max_edits:
+            return False
+    return len(shingles_a & shingles_b) / len(shingles_a | shingles_b) >= SIMILARITY_THRESHOLD
+
+
+def shingles(key):
+    text = key.replace(" ", "_")
+    return {text[i:i + SHINGLE_SIZE] for i in range(max(1, len(text) - SHINGLE_SIZE + 1))}
+
+
+def minhash_signatures(shingle_sets):
+    """MinHash signatures (one row of NUM_PERMUTATIONS values per shingle set), computed in batches."""
+    signatures = np.empty((len(shingle_sets), NUM_PERMUTATIONS), dtype=np.uint64)
+    for start in range(0, len(shingle_sets), MINHASH_BATCH):
+        batch = shingle_sets[start:start + MINHASH_BATCH]
+        lengths = np.fromiter(map(len, batch), dtype=np.int64, count=len(batch))
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for shingle_set in batch for s in shingle_set),
+                             dtype=np.uint64, count=int(lengths.sum()))
+        permuted = hashes[:, None] * _PERM_A + _PERM_B
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        signatures[start:start + len(batch)] = np.minimum.reduceat(permuted, offsets, axis=0)
+    return signatures
+
+
+def lsh_candidates(signatures):
+    """Index pairs that agree on all rows of at least one band."""
+    band_rows = NUM_PERMUTATIONS // LSH_BANDS
+    pairs = set()
+    for band in range(LSH_BANDS):
+        rows = np.ascontiguousarray(signatures[:, band * band_rows:(band + 1) * band_rows])
+        _, bucket_of, bucket_sizes = np.unique(rows.view(np.dtype((np.void, rows.itemsize * band_rows))).ravel(),
+                                               return_inverse=True, return_counts=True)
+        shared = np.flatnonzero(bucket_sizes[bucket_of] > 1)
+        buckets = defaultdict(list)
+        for i in shared.tolist():
+            buckets[bucket_of[i]].append(i)
+        for members in buckets.values():
+            pairs.update((a, b) for n, a in enumerate(members) for b in members[n + 1:])
+    return pairs
+
+
+def _alias_table(names, union_find, rank):
+    """Groups names by union-find root; the lowest-ranked name of each group is canonical."""
+    clusters = defaultdict(list)
+    for name in names:
+        clusters[union_find.find(name)].append(name)
+    aliases = {}
+    for members in clusters.values():
+        if len(members) < 2:
+            continue
+        canonical = min(members, key=rank)
+        aliases.update({name: canonical for name in members if name != canonical})
+    return aliases
+
+
+def resolve_names(counts):
+    """
+    Batch-resolves methodology or topic names. `counts` maps each surface form to the
+    number of papers using it. Returns {alias: canonical name} for every merged name.
+
+    Names are merged when they share a normalized key, when one is the acronym given in
+    parentheses by exactly one other ("Long Short-Term Memory (LSTM)"), or when MinHash LSH
+    puts them in a common bucket and `similar_keys` accepts them. Only LSH candidates are
+    compared, so the cost grows with the number of names rather than the number of pairs.
+    """
+    names = list(counts)
+    union_find = UnionFind()
+
+    by_key = defaultdict(list)
+    for name in names:
+        by_key[normalize_name(name) or name.lower()].append(name)
+    for members in by_key.values():
+        for name in members[1:]:
+            union_find.union(members[0], name)
+
+    # Acronyms: only explicit "Expansion (ACRONYM)" forms; guessing from initials would
+    # merge unrelated names ("VAR" and "Value at Risk").
+    expansions = defaultdict(set)
+    for name in names:
+        short = parenthetical(name)
+        if short:
+            expansions[short].add(normalize_name(name))
+    for short, keys in expansions.items():
+        if short in by_key and len(keys) == 1:
+            union_find.union(by_key[next(iter(keys))][0], by_key[short][0])
+
+    # Fuzzy variants: MinHash LSH over the distinct keys.
+    keys = [key for key in by_key if len(key) >= MIN_FUZZY_LENGTH]
+    shingle_sets = [shingles(key) for key in keys]
+    if keys:
+        for i, j in lsh_candidates(minhash_signatures(shingle_sets)):
+            if similar_keys(keys[i], keys[j], shingle_sets[i], shingle_sets[j]):
+                union_find.union(by_key[keys[i]][0], by_key[keys[j]][0])
+
+    # The most used surface form wins; ties go to the shorter, then alphabetically first name.
+    return _alias_table(names, union_find, lambda name: (-counts[name], len(name), name))
+
+
+def author_key(name):
+    """Normalized full name: "Müller, J.-P." style punctuation and accents removed."""
+    text = strip_accents(name).lower().replace("-", " ")
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+
+def resolve_authors(counts):
+    """
+    Batch-resolves author names (as "Forenames Surname"). Identical normalized names are
+    merged, and an initials-only form ("J. Smith") is merged into the full form
+    ("John Smith") only when exactly one full name shares that surname and initial.
+    Bare surnames (older metadata) are never merged. Returns {alias: canonical name}.
+    """
+    names = list(counts)
+    union_find = UnionFind()
+
+    by_key = defaultdict(list)
+    for name in names:
+        by_key[author_key(name)].append(name)
+    for members in by_key.values():
+        for name in members[1:]:
+            union_find.union(members[0], name)
+
+    # Block on surname + first initial; only names in the same block are compared.
+    blocks = defaultdict(lambda: ([], []))
+    for key in by_key:
+        words = key.split()
+        if words and words[-1] in NAME_SUFFIXES:
+            words = words[:-1]
+        if len(words) < 2:
+            continue
+        full, initials = blocks[(words[-1], words[0][0])]
+        (initials if all(len(w) == 1 for w in words[:-1]) else full).append(key)
+    for full, initials in blocks.values():
+        if len(full) == 1:
+            for key in initials:
+                union_find.union(by_key[full[0]][0], by_key[key][0])
+
+    def rank(name):
+        forenames = author_key(name).split()[:-1]
+        # Full forenames beat initials; then the most used, then the longest form.
+        return (all(len(w) == 1 for w in forenames), -counts[name], -len(name), name)
+
+    return _alias_table(names, union_find, rank)
@@ -5,20 +5,33 @@ import time
 import networkx as nx
 from tqdm import tqdm
 import re  # Import the regular expression module
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # Import configuration from config.py
 # NOTE: We will ignore the API key from config and use a local endpoint instead.
 from config import EXTRACTION_PROMPT_TEMPLATE
+from tracing import get_tracer
+from entity_resolution import resolve_authors, resolve_names
+from citations import normalize_paper_id
+from aggregates import AGGREGATES_PATH, GraphAggregates
+
+tracer = get_tracer("kg_builder")
 
 # --- Configuration ---
 METADATA_DIR = "metadata"
 GRAPH_OUTPUT_PATH = "knowledge_graph.gexf"
+ENTITY_ALIASES_PATH = "entity_aliases.json"
+CITATIONS_PATH = "citations.json"  # written by citations.py
 MAX_RETRIES = 3
-RETRY_DELAY = 5  # seconds
+RETRY_DELAY = float(os.environ.get("ARKIV_RETRY_DELAY", 5))  # seconds
 
 # --- Local LLM Configuration ---
-LOCAL_LLM_ENDPOINT = "http://localhost:11434/api/chat" # Default for Ollama
-LOCAL_MODEL_NAME = "deepseek-r1:32b" # The model you have installed
+LOCAL_LLM_ENDPOINT = os.environ.get("LOCAL_LLM_ENDPOINT", "http://localhost:11434/api/chat") # Default for Ollama
+LOCAL_MODEL_NAME = os.environ.get("LOCAL_MODEL_NAME", "deepseek-r1:32b") # The model you have installed
+# Number of LLM requests kept in flight. With 1, every prompt sees all topics found so far;
+# with more, a prompt only sees the topics found before it was submitted.
+LLM_CONCURRENCY = int(os.environ.get("ARKIV_LLM_CONCURRENCY", 1))
 
 def sanitize_for_xml(text):
     """Removes characters that are invalid in XML 1.0."""
@@ -50,28 +63,104 @@ def call_llm_api(abstract, existing_topics):
         "stream": False   # We want the full response at once
     }
 
-    for attempt in range(MAX_RETRIES):
-        try:
-            # Note: No headers needed for a local, unsecured endpoint
-            response = requests.post(LOCAL_LLM_ENDPOINT, json=payload, timeout=120) # Increased timeout for local model
-            response.raise_for_status()
-            
-            # Ollama nests the JSON content differently
-            response_data = response.json()
-            content = response_data['message']['content']
-            return json.loads(content)
-
-        except requests.exceptions.RequestException as e:
-            print(f" - Local server error: {e}. Is Ollama running? Retrying in {RETRY_DELAY}s...")
-            time.sleep(RETRY_DELAY)
-        except (json.JSONDecodeError, KeyError) as e:
-            print(f" - Error decoding JSON or parsing response from local model: {e}. Retrying...")
-            time.sleep(RETRY_DELAY)
-    
-    print(" - Failed to get a valid response from the local model after multiple retries.")
-    return None
+    with tracer.span("llm_call", model=LOCAL_MODEL_NAME) as span:
+        span.add("prompt_bytes", len(prompt))
+        for attempt in range(MAX_RETRIES):
+            if attempt:
+                span.add("retries")
+            try:
+                # Note: No headers needed for a local, unsecured endpoint
+                response = requests.post(LOCAL_LLM_ENDPOINT, json=payload, timeout=120) # Increased timeout for local model
+                response.raise_for_status()
+                
+                # Ollama nests the JSON content differently
+                response_data = response.json()
+                # Ollama reports token usage alongside the message.
+                span.add("prompt_tokens", response_data.get("prompt_eval_count", 0))
+                span.add("completion_tokens", response_data.get("eval_count", 0))
+                content = response_data['message']['content']
+                return json.loads(content)
+
+            except requests.exceptions.RequestException as e:
+                print(f" - Local server error: {e}. Is Ollama running? Retrying in {RETRY_DELAY}s...")
+                time.sleep(RETRY_DELAY)
+            except (json.JSONDecodeError, KeyError) as e:
+                print(f" - Error decoding JSON or parsing response from local model: {e}. Retrying...")
+                time.sleep(RETRY_DELAY)
+        
+        span.add("failures")
+        print(" - Failed to get a valid response from the local model after multiple retries.")
+        return None
 
 
+def ordered_extractions(papers, executor, existing_topics):
+    """
+    Submits LLM extraction for each paper, keeping up to LLM_CONCURRENCY requests in flight,
+    and yields (paper, future) pairs in input order. The caller updates `existing_topics`
+    between items, so later submissions see the topics found so far.
+    """
+    pending = deque()
+    for paper in papers:
+        # Pass a snapshot: the worker thread sorts the set while the caller keeps adding to it.
+        pending.append((paper, executor.submit(call_llm_api, paper["abstract"], set(existing_topics))))
+        if len(pending) >= LLM_CONCURRENCY:
+            yield pending.popleft()
+    while pending:
+        yield pending.popleft()
+
+def add_citation_edges(G, citations_path=CITATIONS_PATH):
+    """
+    Adds paper -> paper "cites" edges from the citation lists written by citations.py.
+    The graph is undirected, so the citing paper ids are recorded on the edge as a
+    space-separated "citing" list (both ids when two papers cite each other). ("type" is
+    reserved for edges in GEXF, hence "relation".)
+    """
+    if not os.path.exists(citations_path):
+        print(f" - No citation data at '{citations_path}'; run citations.py to add citation edges.")
+        return 0
+    with open(citations_path, 'r', encoding='utf-8') as f:
+        citations = json.load(f)["citations"]
+    added = 0
+    with tracer.span("add_citations") as span:
+        for citing, cited_papers in citations.items():
+            citing = normalize_paper_id(citing)  # older citations.json files may hold versioned ids
+            if citing not in G:
+                continue
+            for cited in map(normalize_paper_id, cited_papers):
+                if cited != citing and cited in G and G.nodes[cited].get("type") == "paper":
+                    previous = G.edges[citing, cited].get("citing", "").split() if G.has_edge(citing, cited) else []
+                    G.add_edge(citing, cited, relation="cites", citing=" ".join(sorted({*previous, citing})))
+                    added += not previous
+        span.add("items", added)
+    print(f" - Added {added} citation edges.")
+    return added
+
+def resolve_entities(G):
+    """
+    Merges alias nodes ("LSTMs", "Long Short-Term Memory") into one canonical node per
+    entity type. Edges move to the canonical node and the merged names are kept in its
+    "aliases" attribute. Returns the alias table {type: {alias: canonical}}.
+    """
+    alias_table = {}
+    for node_type, resolver in (("author", resolve_authors), ("methodology", resolve_names), ("topic", resolve_names)):
+        with tracer.span("resolve_entities", type=node_type) as span:
+            # Entity nodes only link to papers, so the degree is the number of papers using the name.
+            counts = {n: G.degree(n) for n, d in G.nodes(data=True) if d.get("type") == node_type}
+            span.add("items", len(counts))
+            aliases = resolver(counts)
+            merged = {}
+            for alias, canonical in aliases.items():
+                for neighbor in list(G.neighbors(alias)):
+                    G.add_edge(canonical, neighbor)
+                G.remove_node(alias)
+                merged.setdefault(canonical, []).append(alias)
+            for canonical, names in merged.items():
+                G.nodes[canonical]["aliases"] = "; ".join(sorted(names))
+            span.add("aliases", len(aliases))
+        alias_table[node_type] = aliases
+        print(f" - Resolved {len(counts)} {node_type} names into {len(counts) - len(aliases)} entities.")
+    return alias_table
+
 def main():
     """
     Reads metadata, calls the LLM to extract entities, and builds a knowledge graph.
@@ -82,58 +171,108 @@ def main():
 
     G = nx.Graph()
     existing_topics = set()
+    aggregates = GraphAggregates(AGGREGATES_PATH)
 
     files_to_process = [f for f in os.listdir(METADATA_DIR) if f.endswith('.json')]
     
-    for filename in tqdm(files_to_process, desc="Building Knowledge Graph"):
-        filepath = os.path.join(METADATA_DIR, filename)
-        with open(filepath, 'r', encoding='utf-8') as f:
-            paper_data = json.load(f)
-
-        paper_id = paper_data.get("id", "Unknown")
-        # Sanitize all text data before adding it to the graph
-        paper_title = sanitize_for_xml(paper_data.get("title", "Unknown Title"))
-        authors = paper_data.get("authors", [])
-        abstract = paper_data.get("abstract", "")
-
-        if not abstract:
-            continue
-
-        # Add paper node
-        G.add_node(paper_id, label=paper_title, type="paper")
+    with tracer.span("build_graph", llm_concurrency=LLM_CONCURRENCY) as span:
+        papers = []
+        for filename in files_to_process:
+            filepath = os.path.join(METADATA_DIR, filename)
+            with open(filepath, 'r', encoding='utf-8') as f:
+                paper_data = json.load(f)
+
+            span.add("items")
+            span.add("bytes", os.path.getsize(filepath))
+            if not paper_data.get("abstract", ""):
+                span.add("skipped")
+                continue
+            papers.append({
+                # oai_down.py writes "id"; the arXiv API scraper (main.py) writes a versioned "paper_id".
+                # Versions are dropped so the ids match the ones in citations.json.
+                "id": normalize_paper_id(paper_data.get("id") or paper_data.get("paper_id", "Unknown")),
+                # Sanitize all text data before adding it to the graph
+                "title": sanitize_for_xml(paper_data.get("title", "Unknown Title")),
+                "authors": paper_data.get("authors", []),
+                "abstract": paper_data.get("abstract", ""),
+                # oai_down.py writes "date"; main.py writes an ISO "published_date".
+                "published_date": (paper_data.get("published_date") or paper_data.get("date") or "")[:10],
+                # oai_down.py stores the categories as one space-separated string in a list.
+                "categories": [c for entry in paper_data.get("categories") or [] for c in entry.split()],
+            })
+
+        with ThreadPoolExecutor(max_workers=LLM_CONCURRENCY) as executor:
+            for paper, extraction in tqdm(ordered_extractions(papers, executor, existing_topics), total=len(papers), desc="Building Knowledge Graph"):
+                paper_id = paper["id"]
+                paper_title = paper["title"]
+                authors = paper["authors"]
+
+                # Add paper node
+                G.add_node(paper_id, label=paper_title, type="paper",
+                           published_date=paper["published_date"], categories=" ".join(paper["categories"]))
+                entities = {"author": [], "methodology": [], "topic": []}
         
-        # Add author nodes and edges
-        for author_name in authors:
-            sanitized_author = sanitize_for_xml(author_name)
-            if sanitized_author not in G:
-                G.add_node(sanitized_author, label=sanitized_author, type="author")
-            G.add_edge(paper_id, sanitized_author)
+                # Add author nodes and edges
+                for author_name in authors:
+                    sanitized_author = sanitize_for_xml(author_name)
+                    if sanitized_author not in G:
+                        G.add_node(sanitized_author, label=sanitized_author, type="author")
+                    G.add_edge(paper_id, sanitized_author)
+                    entities["author"].append(sanitized_author)
         
-        # Extract and add methodology and topic nodes
-        extracted_data = call_llm_api(abstract, existing_topics)
+                # Extract and add methodology and topic nodes
+                extracted_data = extraction.result()
         
-        if extracted_data:
-            for methodology in extracted_data.get("methodologies", []):
-                sanitized_methodology = sanitize_for_xml(methodology)
-                if sanitized_methodology not in G:
-                    G.add_node(sanitized_methodology, label=sanitized_methodology, type="methodology")
-                G.add_edge(paper_id, sanitized_methodology)
-
-            for topic in extracted_data.get("topics", []):
-                sanitized_topic = sanitize_for_xml(topic)
-                if sanitized_topic not in G:
-                    G.add_node(sanitized_topic, label=sanitized_topic, type="topic")
-                existing_topics.add(sanitized_topic)
-                G.add_edge(paper_id, sanitized_topic)
+                if extracted_data:
+                    for methodology in extracted_data.get("methodologies", []):
+                        sanitized_methodology = sanitize_for_xml(methodology)
+                        if sanitized_methodology not in G:
+                            G.add_node(sanitized_methodology, label=sanitized_methodology, type="methodology")
+                        G.add_edge(paper_id, sanitized_methodology)
+                        entities["methodology"].append(sanitized_methodology)
+
+                    for topic in extracted_data.get("topics", []):
+                        sanitized_topic = sanitize_for_xml(topic)
+                        if sanitized_topic not in G:
+                            G.add_node(sanitized_topic, label=sanitized_topic, type="topic")
+                        existing_topics.add(sanitized_topic)
+                        G.add_edge(paper_id, sanitized_topic)
+                        entities["topic"].append(sanitized_topic)
+
+                # Keep the trend and co-authorship aggregates in step with the graph.
+                if aggregates.add_paper(paper_id, paper["published_date"], paper["categories"], entities):
+                    span.add("aggregated")
     
+    print("\nAdding citation edges...")
+    add_citation_edges(G)
+
+    print("\nResolving entity aliases...")
+    alias_table = resolve_entities(G)
+    with open(ENTITY_ALIASES_PATH, 'w', encoding='utf-8') as f:
+        json.dump(alias_table, f, indent=2, ensure_ascii=False)
+    print(f"Alias table saved to {ENTITY_ALIASES_PATH}")
+
+    with tracer.span("aggregates") as span:
+        aggregates.set_aliases(alias_table)
+        removed = aggregates.prune(paper["id"] for paper in papers)
+        aggregates.commit()
+        span.add("removed", removed)
+    print(f"Aggregates saved to {AGGREGATES_PATH} ({removed} papers no longer in the corpus removed)")
+
     print(f"\nKnowledge graph construction complete.")
     print(f" - Total nodes: {G.number_of_nodes()}")
     print(f" - Total edges: {G.number_of_edges()}")
 
     # Save the graph
-    nx.write_gexf(G, GRAPH_OUTPUT_PATH)
+    with tracer.span("write_gexf", nodes=G.number_of_nodes(), edges=G.number_of_edges()) as span:
+        nx.write_gexf(G, GRAPH_OUTPUT_PATH)
+        span.add("bytes", os.path.getsize(GRAPH_OUTPUT_PATH))
     print(f"Graph saved to {GRAPH_OUTPUT_PATH}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        tracer.print_summary()
+        tracer.write()
\ No newline at end of file
@@ -6,7 +6,41 @@ import os
 import time
 import json
 
+from tracing import get_tracer
+
+tracer = get_tracer("oai_down")
+
 categories = ['q-fin:q-fin', 'stat:stat:ML', 'cs:cs:LG', 'econ:econ:EM']
+ARXIV_NS = '{http://arxiv.org/OAI/arXiv/}'
+
+def parse_authors(record):
+    """
+    Full author names ("Forenames Keyname Suffix") from an arXiv-format record.
+    The flattened record.metadata only has separate keyname/forenames lists, which
+    cannot be zipped back together when an author has no forenames.
+    """
+    authors = []
+    for author in record.xml.iter(f'{ARXIV_NS}author'):
+        parts = (author.findtext(f'{ARXIV_NS}{field}') for field in ('forenames', 'keyname', 'suffix'))
+        name = " ".join(part.strip() for part in parts if part and part.strip())
+        if name:
+            authors.append(name)
+    return authors or record.metadata.get('keyname', [])
+
+def write_if_changed(path, metadata):
+    """
+    Writes the metadata JSON only if it differs from the file on disk, so unchanged papers
+    keep their mtime and the pipeline's stat-based fingerprints see no change.
+    Returns the number of bytes written (0 if the file was already up to date).
+    """
+    content = json.dumps(metadata, indent=2)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == content:
+                return 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return len(content)
 
 # 1. Use OAI-PMH to get metadata with category information
 def get_papers_by_categories(categories, max_papers=30000, metadata_dir="./metadata/"):
@@ -19,34 +53,38 @@ def get_papers_by_categories(categories, max_papers=30000, metadata_dir="./metad
     for category in categories:
             
         try:
-            records = sickle.ListRecords(metadataPrefix='arXiv', set=category)
-            count = 0
+            with tracer.span("fetch_metadata", category=category) as span:
+                records = sickle.ListRecords(metadataPrefix='arXiv', set=category)
+                count = 0
             
-            for record in records:
-                if count >= papers_per_category:
-                    break
+                for record in records:
+                    if count >= papers_per_category:
+                        break
                     
-                arxiv_id = record.header.identifier.replace('oai:arXiv.org:', '')
-                paper_ids.add(arxiv_id)
+                    arxiv_id = record.header.identifier.replace('oai:arXiv.org:', '')
+                    paper_ids.add(arxiv_id)
 
-                metadata = {
-                    "id": arxiv_id,
-                    "title": record.metadata.get('title', [''])[0],
-                    "authors": record.metadata.get('keyname', []),
-                    "categories": record.metadata.get('categories', []),
-                    "abstract": record.metadata.get('abstract', [''])[0],
-                    "date": record.metadata.get('created', [''])[0],
-                    "update_date": record.header.datestamp,
-                    "doi": record.metadata.get('doi', []),
-                }
+                    metadata = {
+                        "id": arxiv_id,
+                        "title": record.metadata.get('title', [''])[0],
+                        "authors": parse_authors(record),
+                        "categories": record.metadata.get('categories', []),
+                        "abstract": record.metadata.get('abstract', [''])[0],
+                        "date": record.metadata.get('created', [''])[0],
+                        "update_date": record.header.datestamp,
+                        "doi": record.metadata.get('doi', []),
+                    }
                 
-                # Save metadata to file
-                with open(os.path.join(metadata_dir, f"{arxiv_id.split('/')[-1]}.json"), 'w') as f:
-                    json.dump(metadata, f, indent=2)
+                    # Save metadata to file (untouched if nothing changed since the last run)
+                    written = write_if_changed(os.path.join(metadata_dir, f"{arxiv_id.split('/')[-1]}.json"), metadata)
+                    span.add("bytes", written)
+                    span.add("unchanged", int(not written))
                 
-                count += 1
+                    count += 1
+                    span.add("items")
                 
         except Exception as e:
+            tracer.count("fetch_metadata.errors")
             print(f"Error fetching category {category}: {e}")
     
     return list(paper_ids)
@@ -77,9 +115,23 @@ def download_papers(paper_ids, output_dir='papers', workers = 40):
             destination_file = os.path.join(output_dir, f"{id}.pdf")
             blob_file_pairs.append((blob, destination_file))
 
-    results = transfer_manager.download_many(
-        blob_file_pairs, max_workers=workers, worker_type="thread"
-    )
+    # Incremental: PDFs already on disk are not downloaded (or rewritten) again.
+    existing = [pair for pair in blob_file_pairs if os.path.exists(pair[1])]
+    blob_file_pairs = [pair for pair in blob_file_pairs if not os.path.exists(pair[1])]
+    print(f"{len(existing)} papers already downloaded, fetching {len(blob_file_pairs)}...")
+
+    with tracer.span("download_papers", workers=workers) as span:
+        span.add("skipped", len(existing))
+        results = transfer_manager.download_many(
+            blob_file_pairs, max_workers=workers, worker_type="thread"
+        ) if blob_file_pairs else []
+        for (_, destination_file), result in zip(blob_file_pairs, results):
+            # download_many returns None on success and the exception otherwise.
+            if isinstance(result, Exception):
+                span.add("errors")
+            elif os.path.exists(destination_file):
+                span.add("items")
+                span.add("bytes", os.path.getsize(destination_file))
             
     print(f"Done.")
     
@@ -89,10 +141,14 @@ def download_papers(paper_ids, output_dir='papers', workers = 40):
 if __name__ == "__main__":
     max_papers = 7000 # for 6hs runtime
     
-    print(f"Fetching metadata for {max_papers} papers in category '{categories}'...")
-    paper_ids = get_papers_by_categories(categories, max_papers)
+    try:
+        print(f"Fetching metadata for {max_papers} papers in category '{categories}'...")
+        paper_ids = get_papers_by_categories(categories, max_papers)
     
-    print(f"Found {len(paper_ids)} papers. Downloading...")
-    downloaded = download_papers(paper_ids)
+        print(f"Found {len(paper_ids)} papers. Downloading...")
+        downloaded = download_papers(paper_ids)
     
-    print(f"Successfully downloaded {downloaded} papers.")
\ No newline at end of file
+        print(f"Successfully downloaded {downloaded} papers.")
+    finally:
+        tracer.print_summary()
+        tracer.write()
\ No newline at end of file
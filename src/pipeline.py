@@ -0,0 +1,270 @@
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+
+from tracing import get_tracer
+
+tracer = get_tracer("pipeline")
+
+# --- Configuration ---
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = ".pipeline_state.json"
+LOG_DIR = os.path.join("logs", "pipeline")
+DEFAULT_CORES = os.cpu_count() or 4
+DEFAULT_LLM_CONCURRENCY = 4
+
+
+class Stage:
+    """
+    One step of the pipeline: a script plus the files it reads and writes.
+
+    A stage is skipped when its outputs exist and the fingerprint of its inputs
+    (including its own source files) matches the one recorded after its last
+    successful run. `resources` maps budget names ("cores", "llm") to the share
+    of the global budget the stage gets while it runs.
+    """
+
+    def __init__(self, name, script, inputs, outputs, deps=(), resources=None, always_run=False):
+        self.name = name
+        self.script = script
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+        self.resources = resources or {}
+        self.always_run = always_run
+
+
+def build_stages(cores, llm_concurrency):
+    # Embedding is CPU-bound and knowledge-graph building is LLM-bound, so when they run
+    # side by side the cores go to the former and one core plus the LLM budget to the latter.
+    # Citation parsing runs next to embedding with a quarter of the cores; it only reads the
+    # last pages of each PDF, so it finishes early and the knowledge graph can then start.
+    citation_cores = max(1, cores // 4)
+    return [
+        Stage("download", "oai_down.py",
+              inputs=[os.path.join(SRC_DIR, "oai_down.py")],
+              outputs=["papers", "metadata"],
+              resources={"cores": 1}, always_run=True),
+        Stage("embeddings", "data_extractor.py",
+              inputs=["papers", os.path.join(SRC_DIR, "data_extractor.py"), os.path.join(SRC_DIR, "dedup.py")],
+              outputs=["vector_store.index", "metadata.json"],
+              deps=["download"], resources={"cores": max(1, cores - 1 - citation_cores)}),
+        Stage("citations", "citations.py",
+              inputs=["papers", "metadata", os.path.join(SRC_DIR, "citations.py")],
+              outputs=["citations.json"],
+              deps=["download"], resources={"cores": citation_cores}),
+        Stage("knowledge_graph", "kg_builder.py",
+              inputs=["metadata", "citations.json", os.path.join(SRC_DIR, "kg_builder.py"),
+                      os.path.join(SRC_DIR, "entity_resolution.py"), os.path.join(SRC_DIR, "aggregates.py"),
+                      os.path.join(SRC_DIR, "config.py")],
+              outputs=["knowledge_graph.gexf", "entity_aliases.json", "kg_aggregates.sqlite"],
+              deps=["download", "citations"], resources={"cores": 1, "llm": llm_concurrency}),
+        Stage("qa", "qa_system.py",
+              inputs=["vector_store.index", "metadata.json", "knowledge_graph.gexf", "kg_aggregates.sqlite",
+                      os.path.join(SRC_DIR, "qa_system.py")],
+              outputs=[],
+              deps=["embeddings", "knowledge_graph"], resources={"cores": 1}),
+    ]
+
+
+def fingerprint(paths):
+    """
+    Hashes the size and modification time of every file under `paths`.
+    Stat-only, so it stays fast on directories with hundreds of thousands of PDFs.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    full = os.path.join(root, name)
+                    stat = os.stat(full)
+                    digest.update(f"{os.path.relpath(full)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode("utf-8"))
+        elif os.path.exists(path):
+            stat = os.stat(path)
+            digest.update(f"{os.path.relpath(path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode("utf-8"))
+        else:
+            digest.update(f"{path}:missing\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_state():
+    if not os.path.exists(STATE_PATH):
+        return {}
+    with open(STATE_PATH, "r") as f:
+        return json.load(f)
+
+
+def save_state(state):
+    with open(STATE_PATH, "w") as f:
+        json.dump(state, f, indent=2)
+
+
+def stage_env(stage):
+    """Translates a stage's resource budget into the environment variables the scripts read."""
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    cores = stage.resources.get("cores")
+    if cores:
+        env["ARKIV_MAX_WORKERS"] = str(cores)
+        # Keep torch / BLAS thread pools inside the budget too.
+        for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+            env[var] = str(cores)
+    if stage.resources.get("llm"):
+        env["ARKIV_LLM_CONCURRENCY"] = str(stage.resources["llm"])
+    return env
+
+
+class Pipeline:
+    def __init__(self, stages, force=(), skip=(), dry_run=False):
+        self.stages = {stage.name: stage for stage in stages}
+        self.force = set(force)
+        self.skip = set(skip)
+        self.dry_run = dry_run
+        self.state = load_state()
+        self.results = {}
+        self._state_lock = threading.Lock()
+
+    def should_run(self, stage, upstream_would_run=()):
+        """
+        Decides whether a stage needs to run. Its dependencies have already finished,
+        so their outputs are on disk and are covered by this stage's input fingerprint.
+        In a dry run they have not actually run, hence `upstream_would_run`.
+        """
+        if stage.name in self.skip:
+            return False, "skipped by request"
+        if stage.name in self.force:
+            return True, "forced"
+        if stage.always_run:
+            return True, "always runs"
+        if upstream_would_run:
+            return True, f"upstream would run ({', '.join(sorted(upstream_would_run))})"
+        missing = [p for p in stage.outputs if not os.path.exists(p)]
+        if missing:
+            return True, f"missing outputs ({', '.join(missing)})"
+        previous = self.state.get(stage.name, {}).get("fingerprint")
+        if previous != fingerprint(stage.inputs):
+            return True, "inputs changed"
+        return False, "up to date"
+
+    def run_stage(self, stage):
+        os.makedirs(LOG_DIR, exist_ok=True)
+        log_path = os.path.join(LOG_DIR, f"{stage.name}.log")
+        budget = ", ".join(f"{k}={v}" for k, v in stage.resources.items())
+        print(f"[{stage.name}] started ({budget}); log: {log_path}")
+        with tracer.span(stage.name, script=stage.script, **stage.resources) as span, open(log_path, "w") as log:
+            process = subprocess.run(
+                [sys.executable, os.path.join(SRC_DIR, stage.script)],
+                env=stage_env(stage), stdout=log, stderr=subprocess.STDOUT,
+            )
+            span.set("returncode", process.returncode)
+        if process.returncode != 0:
+            print(f"[{stage.name}] FAILED with exit code {process.returncode} after {span.duration:.1f}s. Last lines:")
+            with open(log_path, "r", errors="replace") as log:
+                for line in log.readlines()[-15:]:
+                    print(f"    {line.rstrip()}")
+            return False, span.duration
+
+        print(f"[{stage.name}] finished in {span.duration:.1f}s")
+        with self._state_lock:
+            self.state[stage.name] = {
+                "fingerprint": fingerprint(stage.inputs),
+                "completed_at": datetime.now(timezone.utc).isoformat(),
+                "seconds": round(span.duration, 3),
+            }
+            save_state(self.state)
+        return True, span.duration
+
+    def run(self):
+        """
+        Runs the stages as a DAG: every stage whose dependencies are finished is started
+        immediately, so independent stages (embeddings, knowledge graph) run concurrently.
+        """
+        pending = dict(self.stages)
+        would_run = set()  # Dry run only: stages that would have run.
+        failed = set()
+        running = {}
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=len(self.stages)) as executor:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    if any(dep in pending or dep in running.values() for dep in stage.deps):
+                        continue
+                    del pending[name]
+                    if any(dep in failed for dep in stage.deps):
+                        self.results[name] = {"status": "blocked"}
+                        failed.add(name)
+                        print(f"[{name}] not run: a dependency failed")
+                        continue
+                    run_it, reason = self.should_run(stage, would_run & set(stage.deps))
+                    if not run_it or self.dry_run:
+                        # Always-run stages (the download) are incremental: whether their dependents
+                        # rerun is decided by the fingerprints of what they actually changed.
+                        if run_it and not stage.always_run:
+                            would_run.add(name)
+                        status = "would run" if run_it else "skipped"
+                        self.results[name] = {"status": status, "reason": reason}
+                        print(f"[{name}] {status}: {reason}")
+                        continue
+                    print(f"[{name}] running: {reason}")
+                    running[executor.submit(self.run_stage, stage)] = name
+
+                if not running:
+                    if pending and all(any(dep in pending for dep in s.deps) for s in pending.values()):
+                        raise RuntimeError(f"Unresolvable stage dependencies: {', '.join(pending)}")
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    ok, seconds = future.result()
+                    self.results[name] = {"status": "ok" if ok else "failed", "seconds": round(seconds, 3)}
+                    if not ok:
+                        failed.add(name)
+
+        wall = time.perf_counter() - start
+        serial = sum(r.get("seconds", 0) for r in self.results.values())
+        print("\n--- Pipeline summary ---")
+        for name, result in self.results.items():
+            seconds = f"{result['seconds']:.1f}s" if "seconds" in result else ""
+            print(f"  {name:<16} {result['status']:<10} {seconds:>9}  {result.get('reason', '')}")
+        print(f"  Wall-clock: {wall:.1f}s (sum of stage times: {serial:.1f}s)")
+        tracer.count("stages_failed", len(failed))
+        return not failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the arKIv pipeline as a DAG, skipping up-to-date stages.")
+    parser.add_argument("--cores", type=int, default=DEFAULT_CORES, help="CPU cores available to the pipeline")
+    parser.add_argument("--llm-concurrency", type=int, default=DEFAULT_LLM_CONCURRENCY,
+                        help="Concurrent requests to the local LLM during knowledge-graph building")
+    parser.add_argument("--force", nargs="*", default=[], metavar="STAGE", help="Rerun these stages regardless of fingerprints")
+    parser.add_argument("--skip", nargs="*", default=[], metavar="STAGE", help="Do not run these stages")
+    parser.add_argument("--offline", action="store_true", help="Skip the download stage and use existing papers")
+    parser.add_argument("--no-qa", action="store_true", help="Skip the example QA stage")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which stages would run")
+    args = parser.parse_args()
+
+    skip = set(args.skip)
+    if args.offline:
+        skip.add("download")
+    if args.no_qa:
+        skip.add("qa")
+
+    pipeline = Pipeline(build_stages(args.cores, args.llm_concurrency), force=args.force, skip=skip, dry_run=args.dry_run)
+    try:
+        ok = pipeline.run()
+    finally:
+        tracer.write()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+import asyncio
+import contextlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Import configuration from config.py
+from config import QA_SERVER_HOST, QA_SERVER_PORT, QA_SERVER_WORKERS, QA_SERVER_IO_WORKERS
+from tracing import get_tracer, format_breakdown
+
+# --- Configuration ---
+MAX_REQUEST_BYTES = 64 * 1024
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+_SENTINEL = object()
+
+
+class QAServer:
+    """
+    A long-running HTTP service around QASystem.
+
+    The models, FAISS index, text metadata and graph are loaded once at startup.
+    Requests run on a large I/O thread pool, since they mostly wait on the LLM; only
+    encoding and FAISS search go to the small compute pool, so long answer streams
+    do not hold back retrieval for new requests. Final answers are streamed back
+    to the client token by token using chunked transfer encoding.
+
+    Endpoints:
+      GET  /health  -> {"status": "loading" | "ready" | "error", "live": true, ...} (503 until ready)
+                       Ready means every component has loaded; "live" only means the server answers.
+      POST /ask     -> body {"question": "..."}; streams the answer as text/plain
+    """
+
+    def __init__(self, host=QA_SERVER_HOST, port=QA_SERVER_PORT, workers=QA_SERVER_WORKERS,
+                 io_workers=QA_SERVER_IO_WORKERS):
+        self.host = host
+        self.port = port
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qa-worker")
+        self.io_executor = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="qa-io")
+        self.qa = None
+        self.status = "loading"
+        self.error = None
+        self.started_at = time.time()
+        self.requests_served = 0
+        self.requests_in_flight = 0
+
+    async def load_models(self):
+        """Loads QASystem (and its models) on the executor without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        try:
+            # Imported here so the server can answer /health while heavy libraries load.
+            from qa_system import QASystem
+            self.qa = await loop.run_in_executor(self.executor, lambda: QASystem(compute_executor=self.executor))
+            self.status = "started"
+        except Exception as e:
+            self.status = "error"
+            self.error = str(e)
+            print(f"[ERROR] Failed to initialize QA System: {e}")
+            return
+        # Components keep loading in the background; wait off the request pool to log the outcome.
+        readiness = await loop.run_in_executor(None, self.qa.wait_until_loaded)
+        if readiness == "ready":
+            print(f"QA server ready after {time.time() - self.started_at:.1f}s.")
+        else:
+            print(f"[ERROR] QA System components failed to load: {self.qa.component_status()}")
+
+    def current_status(self):
+        """Readiness is derived from the components: "loading" until all are loaded, "error" if one failed."""
+        if self.qa is None:
+            return self.status
+        return self.qa.readiness()
+
+    async def run_blocking(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.io_executor, func, *args)
+
+    async def iterate_blocking(self, generator):
+        """
+        Drains a blocking generator on the I/O executor and yields its items asynchronously.
+        If the consumer stops early (e.g. the client disconnected), the generator is closed
+        at its next item instead of being drained, so the worker thread is freed.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        cancelled = threading.Event()
+
+        def pump():
+            try:
+                for item in generator:
+                    if cancelled.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, item)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                if hasattr(generator, "close"):
+                    generator.close()
+                loop.call_soon_threadsafe(queue.put_nowait, _SENTINEL)
+
+        pump_future = loop.run_in_executor(self.io_executor, pump)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _SENTINEL:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            cancelled.set()
+            await pump_future
+
+    # --- HTTP plumbing ---
+
+    async def read_request(self, reader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        parts = request_line.decode("latin-1").split()
+        if len(parts) != 3:
+            raise ValueError("Malformed request line.")
+        method, path, _ = parts
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length", 0))
+        if length > MAX_REQUEST_BYTES:
+            raise OverflowError("Request body too large.")
+        body = await reader.readexactly(length) if length else b""
+        return method, path.split("?")[0], headers, body
+
+    async def send_json(self, writer, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def start_stream(self, writer, extra_headers):
+        head = [
+            "HTTP/1.1 200 OK",
+            "Content-Type: text/plain; charset=utf-8",
+            "Transfer-Encoding: chunked",
+            "Cache-Control: no-cache",
+            "Connection: close",
+        ]
+        head += [f"{name}: {value}" for name, value in extra_headers.items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+
+    async def send_chunk(self, writer, text):
+        data = text.encode("utf-8")
+        if not data:
+            return
+        writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+        await writer.drain()
+
+    async def end_stream(self, writer):
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    # --- Handlers ---
+
+    async def handle_health(self, writer):
+        status = self.current_status()
+        payload = {
+            "status": status,
+            "live": True,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "requests_served": self.requests_served,
+            "requests_in_flight": self.requests_in_flight,
+        }
+        if self.qa is not None:
+            payload["components"] = self.qa.component_status()
+            payload["caches"] = self.qa.cache_stats()
+            payload["latency"] = get_tracer("qa_system").summary()
+        if self.error:
+            payload["error"] = self.error
+        await self.send_json(writer, 200 if status == "ready" else 503, payload)
+
+    async def handle_ask(self, writer, body):
+        # Questions are accepted while components load (each waits for what it needs),
+        # but not before QASystem exists or once a component has failed.
+        status = self.current_status()
+        if self.qa is None or status == "error":
+            await self.send_json(writer, 503, {"error": f"QA System is {status}."})
+            return
+
+        try:
+            question = json.loads(body or b"{}").get("question", "").strip()
+        except (json.JSONDecodeError, AttributeError):
+            question = ""
+        if not question:
+            await self.send_json(writer, 400, {"error": "Request body must be JSON with a non-empty 'question'."})
+            return
+
+        print(f"--- New Question ---\nUser: {question}")
+        start = time.perf_counter()
+        timings = {}
+        try:
+            tool_choice, context = await self.run_blocking(self.qa.retrieve_context, question, timings)
+        except Exception as e:
+            print(f"[ERROR] Retrieval failed: {e}")
+            await self.send_json(writer, 500, {"error": f"Retrieval failed: {e}"})
+            return
+
+        await self.start_stream(writer, {"X-Route": tool_choice})
+        # aclosing() runs iterate_blocking's cleanup as soon as sending fails, not at garbage collection.
+        async with contextlib.aclosing(self.iterate_blocking(self.qa.stream_answer(question, context, timings))) as tokens:
+            async for token in tokens:
+                await self.send_chunk(writer, token)
+        await self.end_stream(writer)
+        print(f"Latency breakdown: {format_breakdown(timings)}"
+              f" | total={(time.perf_counter() - start) * 1000:.1f}ms")
+
+    async def handle_connection(self, reader, writer):
+        self.requests_in_flight += 1
+        try:
+            try:
+                request = await self.read_request(reader)
+            except OverflowError as e:
+                await self.send_json(writer, 413, {"error": str(e)})
+                return
+            except (ValueError, asyncio.IncompleteReadError) as e:
+                await self.send_json(writer, 400, {"error": str(e)})
+                return
+            if request is None:
+                return
+
+            method, path, _, body = request
+            if path == "/health":
+                await self.handle_health(writer)
+            elif path == "/ask":
+                if method != "POST":
+                    await self.send_json(writer, 405, {"error": "Use POST /ask."})
+                    return
+                await self.handle_ask(writer, body)
+            else:
+                await self.send_json(writer, 404, {"error": f"Unknown path '{path}'."})
+            self.requests_served += 1
+        except ConnectionError:
+            pass  # Client went away mid-stream.
+        except Exception as e:
+            print(f"An unexpected error occurred while handling a request: {e}")
+        finally:
+            self.requests_in_flight -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self):
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        print(f"QA server listening on http://{self.host}:{self.port} (loading models...)")
+        asyncio.get_running_loop().create_task(self.load_models())
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve the arKIv QA system over HTTP.")
+    parser.add_argument("--host", default=QA_SERVER_HOST)
+    parser.add_argument("--port", type=int, default=QA_SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=QA_SERVER_WORKERS, help="Threads for encoding and FAISS search")
+    parser.add_argument("--io-workers", type=int, default=QA_SERVER_IO_WORKERS, help="Threads waiting on the LLM")
+    args = parser.parse_args()
+
+    server = QAServer(host=args.host, port=args.port, workers=args.workers, io_workers=args.io_workers)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        print("\nQA server stopped.")
+
+
+if __name__ == "__main__":
+    main()
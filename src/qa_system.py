@@ -1,23 +1,77 @@
 import os
 import json
-import faiss
-import networkx as nx
-import numpy as np
-import openai
-from sentence_transformers import SentenceTransformer
+import hashlib
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Heavy libraries (torch via sentence_transformers, faiss, networkx, openai) are
+# imported inside the loaders below so they load in parallel, and only when needed.
 
 # Import configuration from config.py
-from config import LLM_API_KEY, LLM_API_ENDPOINT
+from config import LLM_API_KEY, LLM_API_ENDPOINT, LLM_BASE_URL
+from cache import LRUCache, PersistentCache
+from aggregates import AGGREGATES_PATH, GraphAggregates, aggregate_context
+from tracing import get_tracer, format_breakdown
 
-client = openai.OpenAI(
-    api_key=LLM_API_KEY
-)
+tracer = get_tracer("qa_system")
+BREAKDOWN_ORDER = ["route", "encode", "search", "aggregate", "extract_entities", "assemble", "generate", "first_token"]
 
 # --- Configuration ---
 VECTOR_STORE_PATH = "vector_store.index"
 TEXT_METADATA_PATH = "metadata.json" # From data_extractor.py
 GRAPH_PATH = "knowledge_graph.gexf"
-MODEL_NAME = 'all-mpnet-base-v2'
+MODEL_NAME = os.environ.get("ARKIV_MODEL_NAME", 'all-mpnet-base-v2')
+
+# --- Cache Configuration ---
+EMBEDDING_CACHE_SIZE = 4096
+EMBEDDING_CACHE_TTL = None  # seconds; embeddings only depend on the model
+RETRIEVAL_CACHE_SIZE = 2048
+RETRIEVAL_CACHE_TTL = 6 * 3600
+RESPONSE_CACHE_PATH = os.path.join(".cache", "llm_responses.sqlite")
+RESPONSE_CACHE_SIZE = 50000
+RESPONSE_CACHE_TTL = 7 * 24 * 3600
+# ARKIV_CACHE=0 disables every cache (load tests measure streaming, not cache replays).
+CACHE_ENABLED = os.environ.get("ARKIV_CACHE", "1") != "0"
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Creates the OpenAI client on first use rather than at import time."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import openai
+                _client = openai.OpenAI(
+                    api_key=LLM_API_KEY,
+                    base_url=LLM_BASE_URL
+                )
+    return _client
+
+def load_model():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(MODEL_NAME)
+
+def load_index():
+    import faiss
+    return faiss.read_index(VECTOR_STORE_PATH)
+
+def load_text_metadata():
+    with open(TEXT_METADATA_PATH, 'r') as f:
+        return json.load(f)
+
+def load_graph():
+    import networkx as nx
+    return nx.read_gexf(GRAPH_PATH)
+
+def load_aggregates():
+    """The materialized aggregates are optional; graphs built before they existed have none."""
+    if not os.path.exists(AGGREGATES_PATH):
+        return None
+    return GraphAggregates(AGGREGATES_PATH, readonly=True)
 
 # --- Prompt Templates ---
 
@@ -25,7 +79,7 @@ ROUTER_PROMPT_TEMPLATE = """
 Based on the user's question, decide the best way to answer it using the available tools.
 You have two tools:
 1. "vector_search": Searches over Vector Embeddings of chunks of text. Good for general questions about concepts, summaries, or "what is" style questions. Use this for broad, semantic searches.
-2. "graph_search": Searches over a structured Knowledge Graph. Good for specific questions about relationships between entities like authors, papers, topics, or methodologies. Use this for "who worked on X", "what methods are used for Y", "list papers by Z" style questions.
+2. "graph_search": Searches over a structured Knowledge Graph. Good for specific questions about relationships between entities like authors, papers, topics, or methodologies. Use this for "who worked on X", "what methods are used for Y", "list papers by Z" style questions, and for counts, trends, top authors or co-authors.
 
 User question: "{question}"
 
@@ -46,68 +100,341 @@ User Question: {question}
 Answer:
 """
 
+NO_CONTEXT_ANSWER = "I'm sorry, I could not find any relevant information in my knowledge base to answer that question."
+
+def normalize_query(text):
+    """Lowercases, strips punctuation and collapses whitespace so near-identical questions share cache keys."""
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+def data_version(paths=(VECTOR_STORE_PATH, TEXT_METADATA_PATH, GRAPH_PATH, AGGREGATES_PATH)):
+    """Fingerprints the data files by size and modification time; changes whenever one is rebuilt."""
+    parts = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            parts.append(f"{path}:{stat.st_size}:{stat.st_mtime_ns}")
+        except FileNotFoundError:
+            parts.append(f"{path}:missing")
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
 class QASystem:
-    def __init__(self):
+    def __init__(self, embedding_cache=None, retrieval_cache=None, response_cache=None, compute_executor=None):
+        """
+        Caches are pluggable: pass any object with get/put/clear/stats (e.g. an LRUCache),
+        or leave them as None to use the defaults configured above. With `compute_executor`,
+        encoding and FAISS search run on it (bounding CPU work) instead of the calling thread.
+        """
+        self.compute_executor = compute_executor
         print("Initializing QA System...")
         if not all(os.path.exists(p) for p in [VECTOR_STORE_PATH, TEXT_METADATA_PATH, GRAPH_PATH]):
             raise FileNotFoundError("Ensure all data files (vector_store.index, metadata.json, knowledge_graph.gexf) are present.")
-        
-        print("Loading Sentence Transformer model...")
-        self.model = SentenceTransformer(MODEL_NAME)
-        
-        print("Loading FAISS index...")
-        self.index = faiss.read_index(VECTOR_STORE_PATH)
-        
-        print("Loading text metadata...")
-        with open(TEXT_METADATA_PATH, 'r') as f:
-            self.text_metadata = json.load(f)
-            
-        print("Loading knowledge graph...")
-        self.graph = nx.read_gexf(GRAPH_PATH)
-        print("QA System ready.\n")
+
+        # Every component loads concurrently in the background; each one is only
+        # waited for when a query path first needs it (see the properties below).
+        self._started_at = time.perf_counter()
+        self._first_answer_reported = False
+        self._loader = ThreadPoolExecutor(max_workers=6, thread_name_prefix="qa-loader")
+        self._components = {}
+        self._load_times = {}
+        self._refresh_lock = threading.Lock()
+        self._start_load("model", load_model)
+        self._start_load("llm_client", get_client)
+        self._load_data()
+
+        if not CACHE_ENABLED:
+            # Zero-size caches keep nothing, and no response cache file is opened.
+            embedding_cache = embedding_cache if embedding_cache is not None else LRUCache(0)
+            retrieval_cache = retrieval_cache if retrieval_cache is not None else LRUCache(0)
+            response_cache = response_cache if response_cache is not None else LRUCache(0)
+        self.embedding_cache = embedding_cache if embedding_cache is not None else LRUCache(EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_TTL)
+        self.retrieval_cache = retrieval_cache if retrieval_cache is not None else LRUCache(RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_TTL)
+        self.response_cache = response_cache if response_cache is not None else PersistentCache(RESPONSE_CACHE_PATH, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+        if hasattr(self.response_cache, "ensure_version"):
+            self.response_cache.ensure_version(self.data_version)
+        print(f"QA System ready in {time.perf_counter() - self._started_at:.2f}s (components loading in background).\n")
+
+    def _compute(self, func, *args):
+        """Runs CPU-bound work on the compute executor if there is one, else inline."""
+        if self.compute_executor is None:
+            return func(*args)
+        return self.compute_executor.submit(func, *args).result()
+
+    def _start_load(self, name, loader):
+        def timed_load():
+            start = time.perf_counter()
+            value = loader()
+            self._load_times[name] = time.perf_counter() - start
+            print(f" - Loaded {name} in {self._load_times[name]:.2f}s")
+            return value
+
+        self._components[name] = self._loader.submit(timed_load)
+
+    def _component(self, name):
+        future = self._components[name]
+        if not future.done():
+            start = time.perf_counter()
+            print(f" - Waiting for {name} to finish loading...")
+            with tracer.span(f"wait_{name}"):
+                value = future.result()
+            print(f" - Waited {time.perf_counter() - start:.2f}s for {name}")
+            return value
+        return future.result()
+
+    @property
+    def model(self):
+        return self._component("model")
+
+    @property
+    def index(self):
+        return self._component("index")
+
+    @property
+    def text_metadata(self):
+        return self._component("text_metadata")
+
+    @property
+    def graph(self):
+        return self._component("graph")
+
+    @property
+    def aggregates(self):
+        return self._component("aggregates")
+
+    def component_status(self):
+        status = {}
+        for name, future in self._components.items():
+            if not future.done():
+                status[name] = "loading"
+            elif future.exception() is not None:
+                status[name] = f"error: {future.exception()}"
+            else:
+                status[name] = f"loaded in {self._load_times.get(name, 0):.2f}s"
+        return status
+
+    def readiness(self):
+        """"error" if any component failed to load, "loading" until all have loaded, else "ready"."""
+        futures = list(self._components.values())
+        if any(f.done() and f.exception() is not None for f in futures):
+            return "error"
+        if not all(f.done() for f in futures):
+            return "loading"
+        return "ready"
+
+    def wait_until_loaded(self):
+        """Blocks until every component has finished loading (successfully or not)."""
+        for future in list(self._components.values()):
+            try:
+                future.result()
+            except Exception:
+                pass
+        return self.readiness()
+
+    def _report_first_answer(self):
+        if self._first_answer_reported:
+            return
+        self._first_answer_reported = True
+        loaded = ", ".join(f"{name}={secs:.2f}s" for name, secs in sorted(self._load_times.items()))
+        print(f"Time to first answer: {time.perf_counter() - self._started_at:.2f}s since startup (loaded: {loaded})")
+
+    def _load_data(self):
+        self.data_version = data_version()
+        self._start_load("index", load_index)
+        self._start_load("text_metadata", load_text_metadata)
+        self._start_load("graph", load_graph)
+        self._start_load("aggregates", load_aggregates)
+
+    def refresh_if_stale(self):
+        """
+        Reloads the index, metadata and graph and invalidates all caches if any data file was rebuilt.
+        """
+        if data_version() == self.data_version:
+            return False
+        with self._refresh_lock:
+            if data_version() == self.data_version:
+                return False
+            print("Data files changed on disk. Reloading and invalidating caches...")
+            self._load_data()
+            self.embedding_cache.clear()
+            self.retrieval_cache.clear()
+            if hasattr(self.response_cache, "ensure_version"):
+                self.response_cache.ensure_version(self.data_version)
+            else:
+                self.response_cache.clear()
+            return True
+
+    def cache_stats(self):
+        return {
+            "data_version": self.data_version,
+            "embedding": self.embedding_cache.stats(),
+            "retrieval": self.retrieval_cache.stats(),
+            "response": self.response_cache.stats(),
+        }
+
+    def _response_cache_key(self, prompt, model):
+        return f"{model}:{hashlib.sha256(prompt.encode('utf-8')).hexdigest()}"
+
+    def _cached_response(self, cache_key):
+        try:
+            return self.response_cache.get(cache_key)
+        except Exception as e:  # e.g. "database is locked" when the CLI and the server share .cache
+            print(f"[WARNING] Response cache read failed: {e}")
+            return None
+
+    def _cache_response(self, cache_key, content):
+        """Stores a completion; a failing cache must not turn a successful answer into an error."""
+        try:
+            self.response_cache.put(cache_key, content)
+        except Exception as e:
+            print(f"[WARNING] Response cache write failed: {e}")
 
     def _call_llm(self, prompt, model="o3-mini"):
+        cache_key = self._response_cache_key(prompt, model)
+        cached = self._cached_response(cache_key)
+        if cached is not None:
+            tracer.count("llm.cache_hits")
+            return cached
+
         if not LLM_API_KEY:
             print("LLM_API_KEY not found. Please check your api.key file.")
             return None
 
+        import openai
         try:
-            response = client.chat.completions.create(
+            response = get_client().chat.completions.create(
                 model=model,
                 messages=[
                     {"role": "user", "content": prompt}
                 ]
             )
-            return response.choices[0].message.content
+            tracer.count("llm.calls")
+            self._count_usage(getattr(response, "usage", None))
+            content = response.choices[0].message.content
         except openai.APIStatusError as e:
             print(f"Error calling LLM API: {e}")
             return None
         except Exception as e:
             print(f"An unexpected error occurred: {e}")
             return None
+        if content is not None:
+            self._cache_response(cache_key, content)
+        return content
+
+    def _stream_llm(self, prompt, model="o3-mini"):
+        """
+        Streams the LLM completion for a prompt, yielding content tokens as they arrive.
+        A cached response is replayed as a single token.
+        """
+        cache_key = self._response_cache_key(prompt, model)
+        cached = self._cached_response(cache_key)
+        if cached is not None:
+            tracer.count("llm.cache_hits")
+            yield cached
+            return
+
+        if not LLM_API_KEY:
+            print("LLM_API_KEY not found. Please check your api.key file.")
+            return
+
+        import openai
+        tokens = []
+        try:
+            stream = get_client().chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ],
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            tracer.count("llm.calls")
+            for chunk in stream:
+                # With include_usage the final chunk carries token usage and no choices.
+                self._count_usage(getattr(chunk, "usage", None))
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if token:
+                    tokens.append(token)
+                    yield token
+        except openai.APIStatusError as e:
+            print(f"Error calling LLM API: {e}")
+            return
+        except Exception as e:
+            print(f"An unexpected error occurred: {e}")
+            return
+        if tokens:
+            self._cache_response(cache_key, "".join(tokens))
+
+    def _count_usage(self, usage):
+        if usage is None:
+            return
+        tracer.count("llm.prompt_tokens", getattr(usage, "prompt_tokens", 0) or 0)
+        tracer.count("llm.completion_tokens", getattr(usage, "completion_tokens", 0) or 0)
 
     def route_query(self, question):
         prompt = ROUTER_PROMPT_TEMPLATE.format(question=question)
-        router_result = self._call_llm(prompt)
+        with tracer.span("route"):
+            router_result = self._call_llm(prompt)
         if router_result and "graph_search" in router_result:
             return "graph_search"
         return "vector_search"
 
+    def encode_query(self, query):
+        normalized = normalize_query(query)
+        with tracer.span("encode"):
+            query_embedding = self.embedding_cache.get(normalized)
+            if query_embedding is None:
+                model = self.model  # waited for here, not on the compute executor
+                query_embedding = self._compute(model.encode, [query]).astype('float32')
+                self.embedding_cache.put(normalized, query_embedding)
+        return query_embedding
+
     def search_vector_store(self, query, k=5):
         print("Performing vector search...")
-        query_embedding = self.model.encode([query]).astype('float32')
-        _, I = self.index.search(query_embedding, k)
+        cache_key = ("vector_search", normalize_query(query), k, self.data_version)
+        cached = self.retrieval_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        query_embedding = self.encode_query(query)
+        index = self.index
+        with tracer.span("search", k=k):
+            _, I = self._compute(index.search, query_embedding, k)
         
-        results = []
-        for i in I[0]:
-            if i != -1: # FAISS returns -1 for no result
-                chunk_info = self.text_metadata.get(str(i))
-                if chunk_info:
-                    results.append(f"From paper {chunk_info['paper_id']}:\n...{chunk_info['chunk_id']}...")
-        return "\n\n".join(results)
+        text_metadata = self.text_metadata
+        with tracer.span("assemble"):
+            results = []
+            for i in I[0]:
+                if i != -1: # FAISS returns -1 for no result
+                    chunk_info = text_metadata.get(str(i))
+                    if chunk_info:
+                        result = f"From paper {chunk_info['paper_id']}:\n...{chunk_info['chunk_id']}..."
+                        # Near-duplicate chunks were not embedded; cite every paper they appear in.
+                        duplicate_papers = sorted({d['paper_id'] for d in chunk_info.get('duplicates', [])} - {chunk_info['paper_id']})
+                        if duplicate_papers:
+                            result += f"\n(Also appears in: {', '.join(duplicate_papers)})"
+                        results.append(result)
+            context = "\n\n".join(results)
+        self.retrieval_cache.put(cache_key, context)
+        return context
 
     def search_knowledge_graph(self, question):
         print("Performing knowledge graph search...")
+        cache_key = ("graph_search", normalize_query(question), self.data_version)
+        cached = self.retrieval_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # Counting, ranking and trend questions are answered from the precomputed aggregates.
+        aggregates = self.aggregates
+        if aggregates is not None:
+            with tracer.span("aggregate"):
+                context = aggregate_context(aggregates, question)
+            if context:
+                self.retrieval_cache.put(cache_key, context)
+                return context
+
         # A more advanced version would translate the question to a Cypher query.
         # For now, we'll extract specific named entities and find their connections.
         extraction_prompt = f"""
@@ -123,7 +450,8 @@ Question: "{question}"
 Result:
 """
         
-        entities_str = self._call_llm(extraction_prompt)
+        with tracer.span("extract_entities"):
+            entities_str = self._call_llm(extraction_prompt)
         try:
             # Clean up potential markdown formatting from the LLM response
             if "```" in entities_str:
@@ -141,47 +469,100 @@ Result:
             return "No specific entities found in the question to search the graph."
 
         print(f" - Found entities: {entities}")
-        context = []
-        for entity in entities:
-            if not isinstance(entity, str):
-                continue # Skip if an item in the list is not a string
-            # Find nodes that match the entity
-            matching_nodes = [n for n, d in self.graph.nodes(data=True) if entity.lower() in d.get('label', '').lower()]
+        graph = self.graph
+        with tracer.span("search"):
+            matching_nodes = []
+            for entity in entities:
+                if not isinstance(entity, str):
+                    continue # Skip if an item in the list is not a string
+                # Find nodes that match the entity
+                # Aliases hold the names merged into a node by entity resolution ("LSTMs" -> "LSTM").
+                matching_nodes.extend(n for n, d in graph.nodes(data=True)
+                                      if entity.lower() in d.get('label', '').lower() or entity.lower() in d.get('aliases', '').lower())
+
+        with tracer.span("assemble"):
+            context = []
             for node in matching_nodes:
-                node_type = self.graph.nodes[node].get('type', 'Unknown')
-                context.append(f"Found Node: {self.graph.nodes[node].get('label')} (Type: {node_type})")
+                node_type = graph.nodes[node].get('type', 'Unknown')
+                context.append(f"Found Node: {graph.nodes[node].get('label')} (Type: {node_type})")
                 # Find its neighbors
-                for neighbor in self.graph.neighbors(node):
-                    neighbor_label = self.graph.nodes[neighbor].get('label')
-                    neighbor_type = self.graph.nodes[neighbor].get('type', 'Unknown')
-                    context.append(f"  - Is connected to: {neighbor_label} (Type: {neighbor_type})")
+                for neighbor in graph.neighbors(node):
+                    neighbor_label = graph.nodes[neighbor].get('label')
+                    neighbor_type = graph.nodes[neighbor].get('type', 'Unknown')
+                    edge = graph.edges[node, neighbor]
+                    if edge.get('relation') == 'cites':
+                        citing = edge.get('citing', '').split()
+                        if node in citing and neighbor in citing:
+                            relation = "Cites and is cited by"
+                        else:
+                            relation = "Cites" if node in citing else "Is cited by"
+                    else:
+                        relation = "Is connected to"
+                    context.append(f"  - {relation}: {neighbor_label} (Type: {neighbor_type})")
         
-        return "\n".join(context) if context else f"Could not find any information about {', '.join(entities)} in the knowledge graph."
+        if not context:
+            return f"Could not find any information about {', '.join(str(e) for e in entities)} in the knowledge graph."
+        context = "\n".join(context)
+        self.retrieval_cache.put(cache_key, context)
+        return context
+
+    def retrieve_context(self, question, timings=None):
+        """
+        Routes the question and retrieves its context.
+        Returns a tuple of (tool_choice, context). If a `timings` dict is given,
+        the per-stage latencies (route, encode, search, assemble...) are added to it.
+        """
+        with tracer.breakdown(timings):
+            self.refresh_if_stale()
+            tool_choice = self.route_query(question)
+            print(f"Routing decision: {tool_choice}")
+            
+            context = ""
+            if tool_choice == "vector_search":
+                context = self.search_vector_store(question)
+            elif tool_choice == "graph_search":
+                context = self.search_knowledge_graph(question)
+        return tool_choice, context
 
     def answer_question(self, question):
         print(f"--- New Question ---")
         print(f"User: {question}")
         
-        tool_choice = self.route_query(question)
-        print(f"Routing decision: {tool_choice}")
-        
-        context = ""
-        if tool_choice == "vector_search":
-            context = self.search_vector_store(question)
-        elif tool_choice == "graph_search":
-            context = self.search_knowledge_graph(question)
+        start = time.perf_counter()
+        timings = {}
+        _, context = self.retrieve_context(question, timings)
             
         if not context:
             print("Could not retrieve any context.")
-            return "I'm sorry, I could not find any relevant information in my knowledge base to answer that question."
+            return NO_CONTEXT_ANSWER
 
         print("\nSynthesizing final answer...")
         final_prompt = FINAL_ANSWER_PROMPT_TEMPLATE.format(context=context, question=question)
-        final_answer = self._call_llm(final_prompt, model="o3") # Use a more capable model for final answer
+        with tracer.breakdown(timings), tracer.span("generate"):
+            final_answer = self._call_llm(final_prompt, model="o3") # Use a more capable model for final answer
         
         print(f"\nFinal Answer: {final_answer}")
+        print(f"Latency breakdown: {format_breakdown(timings, BREAKDOWN_ORDER)} | total={(time.perf_counter() - start) * 1000:.1f}ms")
+        self._report_first_answer()
         return final_answer
 
+    def stream_answer(self, question, context, timings=None):
+        """
+        Streams the final answer for an already retrieved context, token by token.
+        Generation time and time to the first token are added to `timings` if given.
+        """
+        with tracer.breakdown(timings), tracer.span("generate"):
+            start = time.perf_counter()
+            if not context:
+                yield NO_CONTEXT_ANSWER
+            else:
+                final_prompt = FINAL_ANSWER_PROMPT_TEMPLATE.format(context=context, question=question)
+                for i, token in enumerate(self._stream_llm(final_prompt, model="o3")):
+                    if i == 0 and timings is not None:
+                        timings["first_token"] = time.perf_counter() - start
+                    yield token
+        self._report_first_answer()
+
 
 if __name__ == '__main__':
     qa = QASystem()
@@ -198,4 +579,7 @@ if __name__ == '__main__':
     qa.answer_question("Explain reinforcement learning in the context of financial trading.")
 
     # Another graph search example
-    qa.answer_question("List papers related to the topic of Algorithmic Trading.")
\ No newline at end of file
+    qa.answer_question("List papers related to the topic of Algorithmic Trading.")
+
+    tracer.print_summary()
+    tracer.write()
\ No newline at end of file
@@ -0,0 +1,268 @@
+import cProfile
+import io
+import itertools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# --- Configuration ---
+METRICS_DIR = os.environ.get("ARKIV_METRICS_DIR", "metrics")
+# Comma-separated stage names to profile, or "all". Empty disables profiling.
+PROFILE_STAGES = {s.strip() for s in os.environ.get("ARKIV_PROFILE", "").split(",") if s.strip()}
+# "cprofile" for deterministic profiling, "sampling" for a low-overhead stack sampler.
+PROFILE_MODE = os.environ.get("ARKIV_PROFILE_MODE", "cprofile")
+SAMPLING_INTERVAL = float(os.environ.get("ARKIV_SAMPLING_INTERVAL", "0.005"))  # seconds
+MAX_RECORDED_SPANS = 10000  # Bounded so a long-running service does not grow forever.
+
+
+class Span:
+    """
+    A single timed stage. Counters (items, bytes, retries, tokens...) are summed
+    per stage in the run summary; attrs are descriptive and only kept on the span.
+    """
+
+    def __init__(self, name, parent=None, **attrs):
+        self.name = name
+        self.parent = parent
+        self.counters = Counter()
+        self.attrs = dict(attrs)
+        self.start = time.perf_counter()
+        self.duration = None
+
+    def add(self, counter, value=1):
+        self.counters[counter] += value
+
+    def set(self, attr, value):
+        self.attrs[attr] = value
+
+    def to_dict(self, origin):
+        record = {
+            "name": self.name,
+            "start_offset": round(self.start - origin, 6),
+            "duration": round(self.duration or 0.0, 6),
+        }
+        if self.parent:
+            record["parent"] = self.parent
+        if self.counters:
+            record["counters"] = dict(self.counters)
+        if self.attrs:
+            record["attrs"] = self.attrs
+        return record
+
+
+class StackSampler:
+    """
+    Samples the stack of one thread at a fixed interval and aggregates the
+    results in collapsed-stack format (compatible with flamegraph.pl / speedscope).
+    """
+
+    def __init__(self, thread_id, interval=SAMPLING_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = [f"{fs.name} ({os.path.basename(fs.filename)}:{fs.lineno})"
+                     for fs in traceback.extract_stack(frame)]
+            self.samples[";".join(stack)] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Tracer:
+    """
+    Records per-stage spans and counters for one run and writes them as JSON.
+    Spans can be nested and used from several threads at once.
+    """
+
+    def __init__(self, run_name, metrics_dir=METRICS_DIR):
+        self.run_name = run_name
+        self.metrics_dir = metrics_dir
+        self.started_at = datetime.now(timezone.utc)
+        self.origin = time.perf_counter()
+        self.counters = Counter()
+        self.stages = {}
+        self.spans = deque(maxlen=MAX_RECORDED_SPANS)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profile_seq = itertools.count(1)
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name, **attrs):
+        stack = self._stack()
+        span = Span(name, parent=stack[-1].name if stack else None, **attrs)
+        stack.append(span)
+        profiler = self._start_profiler(name)
+        try:
+            yield span
+        except Exception as e:
+            span.set("error", f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            span.duration = time.perf_counter() - span.start
+            stack.pop()
+            if profiler:
+                self._stop_profiler(name, profiler)
+            self._record(span)
+
+    def _record(self, span):
+        with self._lock:
+            self.spans.append(span)
+            stage = self.stages.setdefault(span.name, {
+                "count": 0, "total_seconds": 0.0, "max_seconds": 0.0, "counters": Counter(),
+            })
+            stage["count"] += 1
+            stage["total_seconds"] += span.duration
+            stage["max_seconds"] = max(stage["max_seconds"], span.duration)
+            stage["counters"].update(span.counters)
+        breakdown = getattr(self._local, "breakdown", None)
+        if breakdown is not None:
+            breakdown[span.name] = breakdown.get(span.name, 0.0) + span.duration
+
+    @contextmanager
+    def breakdown(self, timings=None):
+        """
+        Collects the duration of every span finished on this thread into `timings`
+        (a dict of span name -> seconds), e.g. to report a per-query latency breakdown.
+        """
+        timings = {} if timings is None else timings
+        previous = getattr(self._local, "breakdown", None)
+        self._local.breakdown = timings
+        try:
+            yield timings
+        finally:
+            self._local.breakdown = previous
+
+    def count(self, counter, value=1):
+        with self._lock:
+            self.counters[counter] += value
+
+    # --- Profiling hook ---
+
+    def _start_profiler(self, name):
+        if not PROFILE_STAGES or ("all" not in PROFILE_STAGES and name not in PROFILE_STAGES):
+            return None
+        if PROFILE_MODE == "sampling":
+            profiler = StackSampler(threading.get_ident())
+            profiler.start()
+            return profiler
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return None  # Another profiler is already active (e.g. a nested profiled span).
+        return profiler
+
+    def _stop_profiler(self, name, profiler):
+        profile_dir = os.path.join(self.metrics_dir, "profiles")
+        os.makedirs(profile_dir, exist_ok=True)
+        stamp = self.started_at.strftime("%Y%m%d-%H%M%S")
+        base = os.path.join(profile_dir, f"{self.run_name}_{stamp}_{name}_{next(self._profile_seq)}")
+
+        if isinstance(profiler, StackSampler):
+            profiler.stop()
+            profiler.write(base + ".collapsed")
+            print(f"[profile] {name}: {sum(profiler.samples.values())} samples written to {base}.collapsed")
+            return
+
+        profiler.disable()
+        profiler.dump_stats(base + ".prof")
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(15)
+        print(f"[profile] {name}: written to {base}.prof\n{summary.getvalue()}")
+
+    # --- Reporting ---
+
+    def summary(self):
+        with self._lock:
+            return {
+                name: {
+                    "count": stage["count"],
+                    "total_seconds": round(stage["total_seconds"], 6),
+                    "mean_seconds": round(stage["total_seconds"] / stage["count"], 6),
+                    "max_seconds": round(stage["max_seconds"], 6),
+                    **({"counters": dict(stage["counters"])} if stage["counters"] else {}),
+                }
+                for name, stage in self.stages.items()
+            }
+
+    def to_dict(self):
+        summary = self.summary()
+        with self._lock:
+            spans = [span.to_dict(self.origin) for span in self.spans]
+            counters = dict(self.counters)
+        return {
+            "run": self.run_name,
+            "started_at": self.started_at.isoformat(),
+            "wall_seconds": round(time.perf_counter() - self.origin, 6),
+            "pid": os.getpid(),
+            "stages": summary,
+            "counters": counters,
+            "spans": spans,
+        }
+
+    def write(self):
+        """
+        Writes the run's metrics to metrics/<run>_<timestamp>.json and
+        metrics/<run>_latest.json. Returns the timestamped path.
+        """
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        stamp = self.started_at.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.metrics_dir, f"{self.run_name}_{stamp}.json")
+        data = self.to_dict()
+        for target in (path, os.path.join(self.metrics_dir, f"{self.run_name}_latest.json")):
+            with open(target, "w") as f:
+                json.dump(data, f, indent=2)
+        print(f"Metrics written to {path}")
+        return path
+
+    def print_summary(self):
+        print(f"\n--- Stage timings ({self.run_name}) ---")
+        for name, stage in self.summary().items():
+            counters = ", ".join(f"{k}={v}" for k, v in stage.get("counters", {}).items())
+            print(f"  {name:<20} {stage['total_seconds']:9.2f}s  x{stage['count']:<6} {counters}")
+
+
+_tracers = {}
+_tracers_lock = threading.Lock()
+
+
+def get_tracer(run_name):
+    """Returns the process-wide tracer for a run name, creating it on first use."""
+    with _tracers_lock:
+        if run_name not in _tracers:
+            _tracers[run_name] = Tracer(run_name)
+        return _tracers[run_name]
+
+
+def format_breakdown(timings, order=None):
+    keys = list(order or []) + [k for k in timings if k not in (order or [])]
+    return " | ".join(f"{k}={timings[k] * 1000:.1f}ms" for k in keys if k in timings)
@@ -0,0 +1,209 @@
+import argparse
+import hashlib
+import json
+import re
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Configuration ---
+HOST = "127.0.0.1"
+PORT = 8001
+FIRST_TOKEN_DELAY = 0.2  # seconds before the first token (or the full response)
+TOKEN_DELAY = 0.02       # seconds between streamed tokens
+ANSWER_TOKENS = 60
+
+ANSWER_TEXT = (
+    "Volatility in financial markets is commonly modelled with GARCH-type models, "
+    "stochastic volatility models and, more recently, neural network approaches such as LSTMs. "
+)
+
+METHODOLOGIES = [
+    "GARCH", "LSTM", "Reinforcement Learning", "Monte Carlo Simulation", "Random Forest",
+    "Stochastic Volatility", "Transformer", "Kalman Filter", "Copula", "Bayesian Inference",
+]
+TOPICS = [
+    "volatility forecasting", "algorithmic trading", "risk management", "option pricing",
+    "portfolio optimization", "market microstructure", "credit risk", "asset pricing",
+]
+DATASETS = ["S&P 500 historical data", "CRSP database", "limit order book data", ""]
+
+
+def extraction_reply(prompt):
+    """
+    Returns deterministic entity-extraction JSON (as an Ollama model would) for kg_builder.py.
+    """
+    abstract = prompt.split("**Abstract:**")[-1]
+    seed = int(hashlib.md5(abstract.encode("utf-8")).hexdigest(), 16)
+    methodologies = [METHODOLOGIES[(seed >> (4 * i)) % len(METHODOLOGIES)] for i in range(1 + seed % 3)]
+    topics = [TOPICS[(seed >> (8 + 4 * i)) % len(TOPICS)] for i in range(1 + (seed >> 3) % 2)]
+    dataset = DATASETS[(seed >> 16) % len(DATASETS)]
+    return json.dumps({
+        "methodologies": sorted(set(methodologies)),
+        "datasets": [dataset] if dataset else [],
+        "topics": sorted(set(topics)),
+    })
+
+
+def canned_reply(prompt):
+    """
+    Returns a deterministic reply that matches the prompt templates used by qa_system.py.
+    """
+    if "Which tool is most appropriate?" in prompt:
+        # Alternate between tools depending on the question so both paths get exercised.
+        # Only the question counts: the router template itself mentions "authors" and "list papers".
+        match = re.search(r'User question: "(.*)"', prompt)
+        question = match.group(1).lower() if match else ""
+        return "graph_search" if "authors" in question or "list papers" in question else "vector_search"
+    if "extract key named entities" in prompt:
+        return '["GARCH"]'
+    words = (ANSWER_TEXT * ((ANSWER_TOKENS // len(ANSWER_TEXT.split())) + 1)).split()
+    return " ".join(words[:ANSWER_TOKENS])
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    """
+    Minimal OpenAI-compatible /v1/chat/completions endpoint, plus an
+    Ollama-compatible /api/chat endpoint for kg_builder.py.
+    """
+
+    protocol_version = "HTTP/1.1"
+    first_token_delay = FIRST_TOKEN_DELAY
+    token_delay = TOKEN_DELAY
+
+    def log_message(self, format, *args):
+        pass  # Keep load test output readable.
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/":
+            # Same liveness response as Ollama, so run.sh's check passes.
+            body = b"Ollama is running"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path.rstrip("/") == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": "stub", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        if self.path == "/api/chat":
+            self._ollama_chat()
+            return
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+
+        request = self._read_json()
+        model = request.get("model", "stub")
+        prompt = "\n".join(m.get("content", "") for m in request.get("messages", []))
+        reply = canned_reply(prompt)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        usage = {
+            "prompt_tokens": len(prompt.split()),
+            "completion_tokens": len(reply.split()),
+            "total_tokens": len(prompt.split()) + len(reply.split()),
+        }
+
+        time.sleep(self.first_token_delay)
+
+        if not request.get("stream"):
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": reply},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta, finish_reason=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        event({"role": "assistant", "content": ""})
+        for i, word in enumerate(reply.split()):
+            if i:
+                time.sleep(self.token_delay)
+            event({"content": word if i == 0 else f" {word}"})
+        event({}, finish_reason="stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _ollama_chat(self):
+        request = self._read_json()
+        prompt = "\n".join(m.get("content", "") for m in request.get("messages", []))
+        reply = extraction_reply(prompt)
+        time.sleep(self.first_token_delay)
+        self._send_json(200, {
+            "model": request.get("model", "stub"),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "message": {"role": "assistant", "content": reply},
+            "done": True,
+            "prompt_eval_count": len(prompt.split()),
+            "eval_count": len(reply.split()),
+        })
+
+
+def make_server(host=HOST, port=PORT, first_token_delay=FIRST_TOKEN_DELAY, token_delay=TOKEN_DELAY):
+    handler = type("ConfiguredStubLLMHandler", (StubLLMHandler,), {
+        "first_token_delay": first_token_delay,
+        "token_delay": token_delay,
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub OpenAI- and Ollama-compatible LLM server for load testing and benchmarks.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--first-token-delay", type=float, default=FIRST_TOKEN_DELAY)
+    parser.add_argument("--token-delay", type=float, default=TOKEN_DELAY)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.first_token_delay, args.token_delay)
+    print(f"Stub LLM server listening on http://{args.host}:{args.port} (OpenAI: /v1, Ollama: /api/chat)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
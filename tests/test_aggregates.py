@@ -0,0 +1,52 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from aggregates import GraphAggregates  # noqa: E402
+
+ALIASES = {"methodology": {"LSTMs": "LSTM"}, "author": {"J. Smith": "John Smith"}}
+
+
+def add_papers(aggregates):
+    aggregates.add_paper("2101.00001", "2021-03-01", ["q-fin.ST"], {
+        "author": ["John Smith", "J. Smith", "Ana Silva"],
+        "methodology": ["LSTM", "LSTMs"],
+    })
+    aggregates.add_paper("2102.00002", "2021-05-01", ["stat.ML"], {
+        "author": ["J. Smith"],
+        "methodology": ["LSTMs"],
+    })
+
+
+def check_counts(aggregates):
+    assert aggregates.trend("methodology", "LSTM") == [("2021", 2)]
+    assert aggregates.trend("methodology", "LSTMs") == [("2021", 2)]
+    assert aggregates.top_authors("methodology", "LSTM") == [("John Smith", 2), ("Ana Silva", 1)]
+    assert aggregates.top_authors() == [("John Smith", 2), ("Ana Silva", 1)]
+    assert aggregates.coauthors("J. Smith") == [("Ana Silva", 1)]
+
+
+def test_aliases_are_counted_once_per_paper(tmp_path):
+    aggregates = GraphAggregates(str(tmp_path / "aggregates.sqlite"))
+    add_papers(aggregates)
+    assert aggregates.set_aliases(ALIASES)
+    check_counts(aggregates)
+    assert not aggregates.set_aliases(ALIASES)
+    check_counts(aggregates)
+
+
+def test_papers_added_after_the_aliases(tmp_path):
+    aggregates = GraphAggregates(str(tmp_path / "aggregates.sqlite"))
+    aggregates.set_aliases(ALIASES)
+    add_papers(aggregates)
+    check_counts(aggregates)
+    aggregates.remove_paper("2102.00002")
+    assert aggregates.trend("methodology", "LSTM") == [("2021", 1)]
+
+
+def test_alias_questions_match_the_canonical_entity(tmp_path):
+    aggregates = GraphAggregates(str(tmp_path / "aggregates.sqlite"))
+    add_papers(aggregates)
+    aggregates.set_aliases(ALIASES)
+    assert aggregates.match_entities("How many papers use LSTMs?") == [("methodology", "LSTM")]
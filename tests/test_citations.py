@@ -0,0 +1,49 @@
+import json
+import os
+import sys
+
+import networkx as nx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+import citations  # noqa: E402
+from kg_builder import add_citation_edges  # noqa: E402
+from synthetic_corpus import generate_corpus  # noqa: E402
+
+
+def test_normalize_paper_id():
+    assert citations.normalize_paper_id("2107.05580v12") == "2107.05580"
+    assert citations.normalize_paper_id("math/0601001v1") == "math/0601001"
+    assert citations.normalize_paper_id("2107.05580") == "2107.05580"
+
+
+def test_versioned_file_names_keep_their_citations(tmp_path, monkeypatch):
+    # The "arxiv" schema names files and ids like main.py does: "2001.00002v1".
+    ids = generate_corpus(str(tmp_path), num_papers=12, pages=1, schema="arxiv")
+    assert all(paper_id.endswith("v1") for paper_id in ids)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(citations, "MAX_WORKERS", 2)
+    citations.main()
+
+    with open(citations.CITATIONS_PATH) as f:
+        cited_by = json.load(f)["citations"]
+    assert cited_by
+    assert not [paper_id for paper_id in cited_by if paper_id.endswith("v1")]
+
+    G = nx.Graph()
+    for paper_id in ids:
+        G.add_node(citations.normalize_paper_id(paper_id), type="paper")
+    pairs = {frozenset((citing, cited)) for citing, cited_ids in cited_by.items() for cited in cited_ids}
+    assert add_citation_edges(G, citations.CITATIONS_PATH) == len(pairs)
+
+
+def test_mutual_citations_keep_both_directions(tmp_path):
+    path = tmp_path / "citations.json"
+    path.write_text(json.dumps({"citations": {"A": ["B", "C"], "Bv2": ["A"]}}))
+    G = nx.Graph()
+    G.add_nodes_from("ABC", type="paper")
+    assert add_citation_edges(G, str(path)) == 2
+    assert G.edges["A", "B"]["citing"] == "A B"
+    assert G.edges["A", "C"]["citing"] == "A"
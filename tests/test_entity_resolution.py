@@ -0,0 +1,52 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from entity_resolution import resolve_authors, resolve_names  # noqa: E402
+
+
+def resolve(*names):
+    return resolve_names({name: 1 for name in names})
+
+
+def test_spelling_variants_are_merged():
+    aliases = resolve_names({"LSTM": 3, "LSTMs": 1, "Monte-Carlo Simulations": 1, "monte carlo simulation": 2})
+    assert aliases == {"LSTMs": "LSTM", "Monte-Carlo Simulations": "monte carlo simulation"}
+
+
+def test_fuzzy_typo_is_merged():
+    aliases = resolve_names({"Stochastic Volatility Model": 5, "Stochastic Volatilty Model": 1})
+    assert aliases == {"Stochastic Volatilty Model": "Stochastic Volatility Model"}
+    aliases = resolve_names({"Heteroskedasticity Robust Estimator": 2, "Heteroscedasticity Robust Estimator": 1})
+    assert aliases == {"Heteroscedasticity Robust Estimator": "Heteroskedasticity Robust Estimator"}
+
+
+def test_extra_words_are_not_merged():
+    assert resolve("Deep Reinforcement Learning", "Reinforcement Learning") == {}
+    assert resolve("Rough Stochastic Volatility Model", "Stochastic Volatility Model") == {}
+
+
+def test_model_families_are_not_merged():
+    assert resolve_names({"GARCH model": 5, "ARCH model": 2, "EGARCH model": 1}) == {}
+    assert resolve("garch volatility model", "arch volatility model", "egarch volatility model") == {}
+
+
+def test_acronym_needs_explicit_parenthetical():
+    assert resolve("VAR", "Value at Risk") == {}
+    aliases = resolve_names({"Long Short-Term Memory (LSTM)": 2, "LSTM": 5})
+    assert aliases == {"Long Short-Term Memory (LSTM)": "LSTM"}
+
+
+def test_acronyms_are_case_sensitive():
+    aliases = resolve_names({"VaR": 3, "VAR": 2, "Value at Risk (VaR)": 1, "Vector Autoregression (VAR)": 1})
+    assert aliases == {"Value at Risk (VaR)": "VaR", "Vector Autoregression (VAR)": "VAR"}
+
+
+def test_ambiguous_parenthetical_is_not_merged():
+    assert resolve("PCA", "Principal Component Analysis (PCA)", "Principal Curve Analysis (PCA)") == {}
+
+
+def test_initials_merge_only_into_unambiguous_full_name():
+    assert resolve_authors({"J. Smith": 2, "John Smith": 1}) == {"J. Smith": "John Smith"}
+    assert resolve_authors({"J. Smith": 1, "John Smith": 1, "Jane Smith": 1}) == {}